@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+import csv
+import os.path
+import sqlite3
+import threading
+import time
+
+
+def checkDigit(digits):
+    # The GS1 check digit of the digits preceding it, weighting 3 and 1 alternately from the right
+    total = sum(int(digit) * (3 if index % 2 == 0 else 1) for index, digit in enumerate(reversed(digits)))
+    return str(-total % 10)
+
+
+def normalizeBarcode(barcode):
+    # Returns the EAN-13 of an EAN-13, UPC-A or EAN-8 barcode, None if it is not one.
+    # A barcode typed without its check digit gets it computed, leading zeros lost by an integer are restored.
+    digits = str(barcode).strip().replace(" ", "").replace("-", "")
+    if not digits.isdigit() or len(digits) > 13:
+        return None
+    # Leading zeros do not change the check digit
+    if len(digits) >= 7 and checkDigit(digits[:-1]) == digits[-1]:
+        return digits.zfill(13)
+    if len(digits) in (7, 11, 12):
+        return (digits + checkDigit(digits)).zfill(13)
+    return None
+
+
+class BarcodeIndex:
+    # The SegaRetro article titles of the barcodes, filled by the successful lookups of every run and by
+    # imported barcode lists. Barcodes SegaRetro did not know are remembered too, for missing_ttl seconds,
+    # so they fail at once instead of after loading their page.
+
+    def __init__(self, path, missing_ttl=7*24*3600):
+        self.missing_ttl = missing_ttl
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS barcodes ("
+                                    "barcode TEXT PRIMARY KEY, title TEXT, source TEXT, stored REAL)")
+
+    def _get(self, barcode):
+        key = normalizeBarcode(barcode)
+        if not key:
+            return None
+        with self.lock:
+            return self.connection.execute("SELECT title, stored FROM barcodes WHERE barcode = ?",
+                                           (key,)).fetchone()
+
+    def find(self, barcode):
+        row = self._get(barcode)
+        return row[0] if row else None
+
+    def isMissing(self, barcode):
+        row = self._get(barcode)
+        return bool(row) and row[0] is None and row[1] >= time.time() - self.missing_ttl
+
+    def record(self, barcode, title, source="segaretro"):
+        key = normalizeBarcode(barcode)
+        if key:
+            with self.lock, self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO barcodes VALUES (?, ?, ?, ?)",
+                                        (key, title, source, time.time()))
+
+    def recordMissing(self, barcode):
+        self.record(barcode, None)
+
+    def importList(self, path):
+        # A CSV file with 'barcode' and 'title' (or 'name') columns. Returns the number of barcodes imported,
+        # the invalid ones are skipped.
+        now = time.time()
+        with open(path, newline="") as barcodes:
+            rows = [(normalizeBarcode(row.get("barcode") or ""), row.get("title") or row.get("name"))
+                    for row in csv.DictReader(barcodes)]
+        rows = [(key, title, os.path.basename(path), now) for key, title in rows if key and title]
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO barcodes VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def close(self):
+        self.connection.close()
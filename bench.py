@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+from main import Store, Collecster, TemplateConfig, SegaRetro, Wikipedia, GiantBomb, AdminSession, \
+                 scrapSegaRetro, scrapWikipedia, scrapGiantBomb, recordGame
+from httpdriver import HttpDriver
+from fixtureserver import FixtureServer, CollecsterServer
+from optionindex import OptionIndex
+from driverpool import DriverPool
+from pictures import PicturePipeline
+from profiler import percentile
+from savedindex import SavedIndex
+
+from PIL import Image
+
+import argparse
+import contextlib
+import io
+import json
+import os.path
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+BARCODE = 5060000000016
+NAME = "Spy vs Spy"
+# Modules of the backends, which a starting program must not import before its mode needs them
+BACKEND_MODULES = ("selenium.webdriver", "requests", "lxml", "PIL")
+
+
+def startup(statements):
+    # Runs the statements in a new interpreter, which fails when they imported a backend
+    check = "\nimport sys\nloaded = [module for module in {!r} if module in sys.modules]" \
+            "\nsys.exit('Imported ' + ', '.join(loaded) if loaded else 0)".format(BACKEND_MODULES)
+    subprocess.run([sys.executable, "-c", statements + check], cwd=os.path.dirname(os.path.abspath(__file__)),
+                   stdout=subprocess.DEVNULL, check=True)
+
+
+def measure(function, runs, trace_memory=False):
+    # Returns the duration of each run, and the peak of memory allocated by the runs when traced
+    durations = []
+    if trace_memory:
+        tracemalloc.start()
+    # The programs messages would drown the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for run in range(runs):
+            start = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - start)
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return durations, peak
+
+
+def summarize(name, durations, peak):
+    values = sorted(durations)
+    return {
+        "benchmark": name,
+        "runs": len(values),
+        "per_minute": 60 * len(values) / sum(values),
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "max": values[-1],
+        "peak_memory": peak,
+    }
+
+
+def report(results):
+    lines = ["{:<20} {:>6} {:>10} {:>9} {:>9} {:>9} {:>10}".format(
+        "benchmark", "runs", "per min", "p50 ms", "p95 ms", "max ms", "peak KiB")]
+    for result in results:
+        lines.append("{:<20} {:>6} {:>10.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>10}".format(
+            result["benchmark"], result["runs"], result["per_minute"],
+            result["p50"] * 1000, result["p95"] * 1000, result["max"] * 1000,
+            "{:.0f}".format(result["peak_memory"] / 1024) if result["peak_memory"] is not None else "-"))
+    return "\n".join(lines)
+
+
+def writePictures(folder, count):
+    for index in range(count):
+        Image.new("RGB", (64, 48), (index % 256, 0, 0)).save(os.path.join(folder, "{:04}.jpg".format(index)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark program, recording games from the saved fixtures"
+                                                 " into a local stand-in of Collecster, without browser nor network.")
+    parser.add_argument("-n", "--runs", type=int, default=20, help="Number of runs of each benchmark.")
+    parser.add_argument("--only", nargs="+", metavar="BENCHMARK", help="Only runs the given benchmarks.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Reports the peak memory allocated by each benchmark. It slows the runs down.")
+    parser.add_argument("--output", help="A JSON file where the results are written, to compare between changes.")
+    parser.add_argument("--max-startup", type=float, metavar="MS",
+                        help="Fails when the median startup of the program, up to its arguments parsing, is slower.")
+    args = parser.parse_args()
+
+    # The options recordGame reads from the command line
+    args.unattended = True
+    args.skip_wikipedia = False
+    args.verbose = False
+    args.timeout = 10
+    args.operator_timeout = 10
+    args.concept = None
+    args.release = None
+
+    with FixtureServer() as sites, CollecsterServer(("collector", "secret")) as admin, \
+         tempfile.TemporaryDirectory() as folder:
+        SegaRetro.origin = sites.origin + "/segaretro"
+        Wikipedia.search_url = sites.origin + "/google/search"
+        GiantBomb.origin = sites.origin + "/giantbomb"
+        Collecster.domain = admin.origin + "/admin/advideogame/"
+
+        credentials_file = os.path.join(folder, "credentials.json")
+        json.dump({"username": "collector", "password": "secret"}, open(credentials_file, "w"))
+
+        config = TemplateConfig()
+        group_size = len(config.occurrence["pictures"])
+        # Each occurrence, from recordGame, recordCopy or prefillOccurrence, takes a group of pictures
+        writePictures(folder, group_size * (3 * args.runs + 1))
+
+        # The HTTP driver stands in for the WebDriver, replaying the fixtures
+        drivers = DriverPool(lambda role: AdminSession(args.timeout) if role == "collecster" else HttpDriver())
+        options = OptionIndex()
+        collecster = Collecster(config, False, args.timeout, args.operator_timeout, options)
+        collecster.login(drivers["collecster"], credentials_file)
+
+        pipeline = PicturePipeline(group_size)
+        pictures = pipeline.stage(folder)
+
+        # The stores the prefill benchmarks fill the forms with, and the releases they refer to
+        store = Store()
+        saved = SavedIndex(os.path.join(folder, "saved.sqlite"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            recordGame(drivers, config, args, pictures, BARCODE, cache=None, options=options, saved=saved)
+        store.concept.name = NAME
+        store.concept.urls = ["https://segaretro.org/Spy_vs_Spy"]
+        store.concept.developer = "First Star Software"
+        store.concept.saved_name = NAME
+        store.release.barcode = BARCODE
+        store.release.publisher = "Sega"
+        store.release.date = scrapSegaRetro(drivers["segaretro"], config, BARCODE).release.date
+        store.release.saved_name = admin.model.choices["releases"][0]
+
+        benchmarks = [
+            # The data layer, and the program up to its arguments parsing
+            ("startupStore", lambda: startup("import store")),
+            ("startupMain", lambda: startup("import main")),
+            ("startupHelp", lambda: startup("import runpy, sys\nsys.argv = ['main.py', '--help']\ntry:\n"
+                                            "    runpy.run_path('main.py', run_name='__main__')\n"
+                                            "except SystemExit:\n    pass")),
+            ("scrapSegaRetro", lambda: scrapSegaRetro(drivers["segaretro"], config, BARCODE)),
+            ("scrapWikipedia", lambda: scrapWikipedia(drivers["wikipedia"], config, NAME, False)),
+            ("scrapGiantBomb", lambda: scrapGiantBomb(drivers["giantbomb"], config, NAME, False)),
+            ("prefillConcept", lambda: collecster.prefillConcept(drivers["collecster"], store.concept)),
+            ("prefillRelease", lambda: collecster.prefillRelease(drivers["collecster"], store)),
+            ("prefillOccurrence", lambda: collecster.prefillOccurrence(drivers["collecster"], store,
+                                                                       iter(pictures.nextGroup()))),
+            ("recordGame", lambda: recordGame(drivers, config, args, pictures, BARCODE, cache=None, options=options)),
+            # Another copy of a saved game
+            ("recordCopy", lambda: recordGame(drivers, config, args, pictures, BARCODE, cache=None, options=options,
+                                              saved=saved)),
+        ]
+
+        results = []
+        try:
+            for name, function in benchmarks:
+                if args.only and name not in args.only:
+                    continue
+                durations, peak = measure(function, args.runs, args.trace_memory)
+                results.append(summarize(name, durations, peak))
+        finally:
+            drivers.close()
+            pipeline.close()
+            saved.close()
+
+    print(report(results))
+    # Kilobytes on Linux
+    print("Maximum resident set size: {:.1f} MiB".format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    for result in results:
+        if args.max_startup and result["benchmark"] == "startupHelp" and result["p50"] * 1000 > args.max_startup:
+            sys.exit("The program starts in {:.0f} ms, above {:.0f} ms".format(result["p50"] * 1000,
+                                                                               args.max_startup))
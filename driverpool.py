@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+import concurrent.futures
+import contextlib
+import json
+import os.path
+import socket
+import threading
+
+from tabdriver import BrowserTabs, TabDriver
+
+
+def freePort():
+    with contextlib.closing(socket.socket()) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def debuggerAlive(address):
+    import urllib.request
+    try:
+        urllib.request.urlopen("http://{}/json/version".format(address), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+class DriverPool:
+    # Hands out drivers by role ("collecster", "segaretro", ...), creating them on demand.
+    # pool[role] is the primary driver of a role, acquire() lends it, then additional ones to concurrent users.
+    # Released drivers stay open until close(), so the browsers are warm for the next game.
+    #
+    # With a keep_file, Chrome instances are left running when the pool closes, and their debugging
+    # addresses are saved so the next run attaches to them instead of starting new browsers.
+    #
+    # With tabs, every Chrome driver is a window of the same browser, so concurrent games cost tabs
+    # instead of browser processes.
+
+    def __init__(self, factory=None, headless=False, keep_file=None, tabs=False):
+        self.factory = factory or self.chrome
+        self.headless = headless
+        self.keep_file = keep_file
+        self.tabs = tabs
+        self.browser = None
+        self.browser_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.primary = {}
+        self.idle = {}
+        self.lent = set() # roles whose primary driver is acquired
+        self.created = []
+        self.addresses = {} # id(driver) -> (role, debugging address) of the browsers to keep
+        self.kept = {}
+        if keep_file and os.path.exists(keep_file):
+            with open(keep_file) as kept:
+                self.kept = json.load(kept)
+
+    def chrome(self, role):
+        if self.tabs:
+            # The browser is started by the first tab
+            with self.browser_lock:
+                if self.browser is None:
+                    self.browser = BrowserTabs(self.startChrome("tabs"))
+            return self.browser.open(role)
+        return self.startChrome(role)
+
+    def startChrome(self, role):
+        # Selenium is only imported by the runs which drive a browser
+        from selenium import webdriver
+        options = webdriver.ChromeOptions()
+        with self.lock:
+            kept = self.kept.get(role, [])
+            address = kept.pop(0) if kept else None
+
+        if address and debuggerAlive(address):
+            options.add_experimental_option("debuggerAddress", address)
+        else:
+            address = None
+            if self.headless:
+                options.add_argument("--headless")
+                options.add_argument("--disable-gpu")
+                options.add_argument("--window-size=1280,1024")
+            if self.tabs:
+                # The tabs in the background run their scripts and timers at full speed
+                for argument in ("--disable-background-timer-throttling", "--disable-renderer-backgrounding",
+                                 "--disable-backgrounding-occluded-windows"):
+                    options.add_argument(argument)
+            if self.keep_file:
+                address = "127.0.0.1:{}".format(freePort())
+                options.add_argument("--remote-debugging-port={}".format(address.split(":")[1]))
+                # The browser survives chromedriver, to be attached to by the next run
+                options.add_experimental_option("detach", True)
+
+        capabilities = options.to_capabilities()
+        if self.tabs:
+            # Page loads return at once, the tabs wait for their page without holding the session
+            capabilities["pageLoadStrategy"] = "none"
+        driver = webdriver.Chrome(desired_capabilities=capabilities)
+        if address:
+            with self.lock:
+                self.addresses[id(driver)] = (role, address)
+        return driver
+
+    def _create(self, role):
+        driver = self.factory(role)
+        with self.lock:
+            self.created.append(driver)
+        return driver
+
+    def __getitem__(self, role):
+        with self.lock:
+            driver = self.primary.get(role)
+        if driver is None:
+            driver = self._create(role)
+            with self.lock:
+                driver = self.primary.setdefault(role, driver)
+        return driver
+
+    def warmUp(self, roles):
+        # Browsers are slow to start, they are all started at once
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(roles), 1)) as executor:
+            list(executor.map(self.__getitem__, roles))
+
+    def acquire(self, role):
+        with self.lock:
+            # The primary driver, already started by warmUp, is lent first
+            if role in self.primary and role not in self.lent:
+                self.lent.add(role)
+                return self.primary[role]
+            idle = self.idle.get(role)
+            if idle:
+                return idle.pop()
+        return self._create(role)
+
+    def release(self, role, driver):
+        with self.lock:
+            if driver is self.primary.get(role):
+                self.lent.discard(role)
+            else:
+                self.idle.setdefault(role, []).append(driver)
+
+    @contextlib.contextmanager
+    def driver(self, role):
+        driver = self.acquire(role)
+        try:
+            yield driver
+        finally:
+            self.release(role, driver)
+
+    def close(self):
+        kept = {}
+        # The tabs are windows of the shared browser, which is closed in their place
+        drivers = [driver for driver in self.created if not isinstance(driver, TabDriver)]
+        if self.browser:
+            drivers.append(self.browser.driver)
+        for driver in drivers:
+            role, address = self.addresses.get(id(driver), (None, None))
+            if address:
+                kept.setdefault(role, []).append(address)
+                # Only chromedriver is stopped, the browser stays open
+                driver.service.stop()
+            else:
+                driver.quit()
+        if self.keep_file:
+            os.makedirs(os.path.dirname(self.keep_file) or ".", exist_ok=True)
+            with open(self.keep_file, "w") as keep:
+                json.dump(kept, keep)
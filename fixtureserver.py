@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+import email
+import email.policy
+import html
+import http.cookies
+import http.server
+import json
+import os.path
+import secrets
+import threading
+import urllib.parse
+
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def normalizeRequest(path):
+    # Query parameters order does not matter when matching a route
+    parsed = urllib.parse.urlsplit(path)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query)))
+    return urllib.parse.unquote(parsed.path) + ("?" + query if query else "")
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    # Serves fixtures/<site>/<path>.html, answering the lookups listed in routes.json with a redirect.
+    # Files missing from a site folder are answered with its 404.html, when there is one.
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        location = self.server.routes.get(normalizeRequest(self.path))
+        if location:
+            return self.respond(302, b"", {"Location": location})
+
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path).rstrip("/")
+        filepath = os.path.normpath(os.path.join(self.server.folder, path.lstrip("/") + ".html"))
+        if filepath.startswith(self.server.folder) and os.path.isfile(filepath):
+            return self.respond(200, open(filepath, "rb").read())
+
+        site = path.lstrip("/").split("/")[0]
+        notFound = os.path.join(self.server.folder, site, "404.html")
+        self.respond(404, open(notFound, "rb").read() if site and os.path.isfile(notFound) else b"Not found")
+
+    def respond(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    def __init__(self, folder=FIXTURES_FOLDER, port=0):
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+        self.httpd.folder = folder
+        with open(os.path.join(folder, "routes.json")) as routes:
+            self.httpd.routes = {normalizeRequest(key): value for key, value in json.load(routes).items()}
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def origin(self):
+        return "http://127.0.0.1:{}".format(self.httpd.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parseForm(headers, body):
+    # Returns the posted fields as name -> list of values, and the uploaded files as name -> (filename, content)
+    content_type = headers.get("Content-Type", "")
+    fields, files = {}, {}
+    if content_type.startswith("multipart/form-data"):
+        message = email.message_from_bytes(
+            "Content-Type: {}\r\n\r\n".format(content_type).encode() + body, policy=email.policy.HTTP)
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename() is not None:
+                files[name] = (part.get_filename(), part.get_payload(decode=True))
+            else:
+                fields.setdefault(name, []).append(part.get_payload(decode=True).decode())
+    else:
+        for name, value in urllib.parse.parse_qsl(body.decode(), keep_blank_values=True):
+            fields.setdefault(name, []).append(value)
+    return fields, files
+
+
+class CollecsterModel:
+    # The forms of the Collecster admin pages, as a list of fields and inlines.
+    # Field: (name, kind, choices source or None, required). Kinds are text, select, multiple, radio and file.
+    # Inline: ("inline", prefix, [fields], extra rows, rendered only when this field is initially set)
+    forms = {
+        "concept": [
+            ("distinctive_name", "text", None, True),
+            ("primary_nature", "select", "natures", True),
+            ("developer", "select", "companies", False),
+            ("inline", "concepturl_set", [("url", "text", None, False)], 3, None),
+        ],
+        "release": [
+            ("concept", "select", "concepts", True),
+            ("partial_date", "text", None, False),
+            ("partial_date_precision", "radio", "precisions", False),
+            ("barcode", "text", None, False),
+            ("release_regions", "multiple", "regions", False),
+            ("system_specification", "select", "specifications", True),
+            ("inline", "attributes", [("attribute", "select", "attributes", False)], 1, None),
+            ("inline", "software", [("publisher", "select", "companies", False)], 1, "concept"),
+        ],
+        "occurrence": [
+            ("release", "select", "releases", True),
+            ("origin", "select", "origins", False),
+            ("inline", "operationalocc", [("working_condition", "select", "conditions", False)], 1, "release"),
+            ("inline", "pictures", [("image_file", "file", None, False),
+                                    ("detail", "select", "details", False),
+                                    ("any_attribute", "select", "attributes", False)], 1, None),
+        ],
+    }
+
+    def __init__(self):
+        self.choices = {
+            "natures": ["Game", "Console", "Accessory"],
+            "companies": ["First Star Software", "Namco", "Sega"],
+            "precisions": ["Day", "Month", "Year"],
+            "regions": ["EU", "US", "JP"],
+            "specifications": ["Master System cartridge game [NTSC-U, PAL]"],
+            "attributes": ["[content]self", "[papers]manual", "[packaging]cartridge box",
+                           "[packaging]hang on tab", "[packaging]seal brand"],
+            "origins": ["Original", "Reproduction"],
+            "conditions": ["Yes", "No", "Unknown"],
+            "details": ["Front", "Back", "Group", "Side label"],
+            "concepts": [],
+            "releases": [],
+            "occurrences": [],
+        }
+        self.uploads = []
+        self.lock = threading.Lock()
+
+
+class CollecsterHandler(http.server.BaseHTTPRequestHandler):
+    # A stand-in for the Collecster Django admin: login with CSRF protection, sessions, the add forms
+    # of concepts, releases and occurrences, and their success messages.
+    protocol_version = "HTTP/1.1"
+    prefix = "/admin/advideogame/"
+
+    def cookies(self):
+        cookies = http.cookies.SimpleCookie(self.headers.get("Cookie", ""))
+        return {key: morsel.value for key, morsel in cookies.items()}
+
+    def session(self):
+        return self.server.sessions.get(self.cookies().get("sessionid"))
+
+    def do_GET(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        session = self.session()
+        if parsed.path == "/admin/login/":
+            return self.render("Log in | Django site admin", self.loginForm(query.get("next", self.prefix)))
+        if session is None:
+            return self.redirect("/admin/login/?" + urllib.parse.urlencode({"next": self.path}))
+        if parsed.path == self.prefix:
+            return self.render("Advideogame administration | Django site admin", "", session)
+        model = self.modelFromPath(parsed.path)
+        if model and parsed.path.endswith("/add/"):
+            return self.render("Add {} | Django site admin".format(model), self.modelForm(model, query), session)
+        if model:
+            return self.render("Select {} to change | Django site admin".format(model), "", session)
+        self.respond(404, b"Not found")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        fields, files = parseForm(self.headers, body)
+        if fields.get("csrfmiddlewaretoken", [None])[0] != self.cookies().get("csrftoken"):
+            return self.respond(403, b"CSRF verification failed. Request aborted.")
+
+        parsed = urllib.parse.urlsplit(self.path)
+        if parsed.path == "/admin/login/":
+            username = fields.get("username", [""])[0]
+            password = fields.get("password", [""])[0]
+            if (username, password) != self.server.credentials:
+                return self.render("Log in | Django site admin",
+                                   '<p class="errornote">Please enter the correct username and password.</p>'
+                                   + self.loginForm(fields.get("next", [self.prefix])[0]))
+            sessionid = secrets.token_hex(16)
+            self.server.sessions[sessionid] = {"messages": []}
+            return self.redirect(fields.get("next", [self.prefix])[0], {"sessionid": sessionid})
+
+        session = self.session()
+        model = self.modelFromPath(parsed.path)
+        if session is None or not model:
+            return self.respond(403, b"Forbidden")
+
+        values = {name: values[0] for name, values in fields.items()}
+        errors = self.validate(model, fields, files)
+        if errors:
+            return self.render("Add {} | Django site admin".format(model),
+                               '<p class="errornote">Please correct the errors below: {}</p>'.format(
+                                   html.escape(", ".join(errors)))
+                               + self.modelForm(model, values), session)
+
+        name = self.save(model, fields, files)
+        session["messages"].append('The {} "<a href="#">{}</a>" was added successfully.'.format(model,
+                                                                                               html.escape(name)))
+        self.redirect(self.prefix + model + "/")
+
+    def modelFromPath(self, path):
+        if path.startswith(self.prefix):
+            model = path[len(self.prefix):].split("/")[0]
+            if model in CollecsterModel.forms:
+                return model
+        return None
+
+    def validate(self, model, fields, files):
+        errors = []
+        for field in CollecsterModel.forms[model]:
+            if field[0] == "inline":
+                continue
+            name, kind, source, required = field
+            for value in fields.get(name, []):
+                if kind in ("select", "multiple", "radio") and value and value not in self.choiceValues(source):
+                    errors.append("{}: select a valid choice".format(name))
+            if required and not any(fields.get(name, [])):
+                errors.append("{}: this field is required".format(name))
+        for field in CollecsterModel.forms[model]:
+            if field[0] == "inline" and "{}-TOTAL_FORMS".format(field[1]) in fields:
+                if not fields["{}-TOTAL_FORMS".format(field[1])][0].isdigit():
+                    errors.append("{}: ManagementForm data is missing or has been tampered with".format(field[1]))
+        return errors
+
+    def choiceValues(self, source):
+        return [str(index) for index in range(1, len(self.server.model.choices[source]) + 1)]
+
+    def label(self, source, value):
+        return self.server.model.choices[source][int(value) - 1]
+
+    def save(self, model, fields, files):
+        data = self.server.model
+        with data.lock:
+            if model == "concept":
+                name = fields["distinctive_name"][0]
+            elif model == "release":
+                name = "{} [{}]".format(self.label("concepts", fields["concept"][0]),
+                                        self.label("specifications", fields["system_specification"][0]))
+            else:
+                release = self.label("releases", fields["release"][0])
+                name = "{} #{}".format(release, len(data.choices["occurrences"]) + 1)
+            data.choices[model + "s"].append(name)
+            data.uploads.extend((name, key, filename, len(content)) for key, (filename, content) in files.items())
+        return name
+
+    def loginForm(self, next_url):
+        return ('<form action="" method="post" id="login-form">{}'
+                '<input type="text" name="username" id="id_username">'
+                '<input type="password" name="password" id="id_password">'
+                '<input type="hidden" name="next" value="{}">'
+                '<input type="submit" value="Log in"></form>').format(self.csrfInput(), html.escape(next_url))
+
+    def csrfInput(self):
+        return '<input type="hidden" name="csrfmiddlewaretoken" value="{}">'.format(self.csrfToken())
+
+    def csrfToken(self):
+        if not hasattr(self, "_csrf"):
+            self._csrf = self.cookies().get("csrftoken") or secrets.token_hex(16)
+        return self._csrf
+
+    def widget(self, name, kind, source, value):
+        element_id = "id_" + name
+        if kind == "text":
+            return '<input type="text" name="{}" id="{}" value="{}">'.format(name, element_id, html.escape(value or ""))
+        if kind == "file":
+            return '<input type="file" name="{}" id="{}">'.format(name, element_id)
+        choices = self.server.model.choices[source]
+        if kind == "radio":
+            return '<ul id="{}">{}</ul>'.format(element_id, "".join(
+                '<li><label><input type="radio" name="{}" value="{}"{}> {}</label></li>'.format(
+                    name, index, " checked" if str(index) == value else "", html.escape(choice))
+                for index, choice in enumerate(choices, 1)))
+        options = "" if kind == "multiple" else '<option value="">---------</option>'
+        options += "".join('<option value="{}"{}>{}</option>'.format(
+                               index, " selected" if str(index) == value else "", html.escape(choice))
+                           for index, choice in enumerate(choices, 1))
+        return '<select name="{}" id="{}"{}>{}</select>'.format(name, element_id,
+                                                               " multiple" if kind == "multiple" else "", options)
+
+    def modelForm(self, model, values):
+        rows = [self.csrfInput()]
+        for field in CollecsterModel.forms[model]:
+            if field[0] != "inline":
+                name, kind, source, required = field
+                rows.append("<div class=\"form-row\">{}</div>".format(self.widget(name, kind, source, values.get(name))))
+                continue
+            _, prefix, inline_fields, extra, dependency = field
+            if dependency and not values.get(dependency):
+                continue
+            total = int(values.get("{}-TOTAL_FORMS".format(prefix), extra))
+            management = "".join('<input type="hidden" name="{}-{}" id="id_{}-{}" value="{}">'.format(
+                                     prefix, key, prefix, key, value)
+                                 for key, value in (("TOTAL_FORMS", total), ("INITIAL_FORMS", 0),
+                                                    ("MIN_NUM_FORMS", 0), ("MAX_NUM_FORMS", 1000)))
+            lines = []
+            for index in list(range(total)) + ["__prefix__"]:
+                cells = "".join("<td>{}</td>".format(self.widget("{}-{}-{}".format(prefix, index, name), kind, source,
+                                                                 values.get("{}-{}-{}".format(prefix, index, name))))
+                                for name, kind, source, required in inline_fields)
+                empty = ' empty-form" id="{}-empty'.format(prefix) if index == "__prefix__" else ""
+                lines.append('<tr class="form-row{}">{}</tr>'.format(empty, cells))
+            lines.append('<tr class="add-row"><td><a href="#">Add another</a></td></tr>')
+            rows.append('<div id="{}-group">{}<div><fieldset><table><tbody>{}</tbody></table></fieldset></div></div>'
+                        .format(prefix, management, "".join(lines)))
+        return '<form enctype="multipart/form-data" action="" method="post" id="{}_form">{}' \
+               '<input type="submit" name="_save" value="Save"></form>'.format(model, "".join(rows))
+
+    def render(self, title, content, session=None):
+        messages = ""
+        if session and session["messages"]:
+            messages = '<ul class="messagelist">{}</ul>'.format(
+                "".join('<li class="success">{}</li>'.format(message) for message in session["messages"]))
+            session["messages"] = []
+        page = '<!DOCTYPE html><html><head><title>{}</title></head><body><div id="container">{}{}</div></body></html>'
+        self.respond(200, page.format(html.escape(title), messages, content).encode(),
+                     {"csrftoken": self.csrfToken()})
+
+    def redirect(self, location, cookies=None):
+        self.respond(302, b"", cookies, {"Location": location})
+
+    def respond(self, status, body, cookies=None, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (cookies or {}).items():
+            self.send_header("Set-Cookie", "{}={}; Path=/".format(key, value))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CollecsterServer(FixtureServer):
+    def __init__(self, credentials=("collector", "secret"), port=0):
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), CollecsterHandler)
+        self.httpd.credentials = tuple(credentials)
+        self.httpd.sessions = {}
+        self.httpd.model = self.model = CollecsterModel()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
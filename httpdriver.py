@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+from selenium.common.exceptions import NoSuchElementException
+
+# lxml and requests are imported once a page is fetched or parsed, importing the module is cheap
+
+from scheduler import scheduler, TransientError
+
+import functools
+import re
+import urllib.parse
+
+
+# Tags after which a browser breaks the line when rendering element text
+BLOCK_TAGS = {"address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset", "figcaption",
+              "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main",
+              "nav", "ol", "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul"}
+
+HIDDEN_TAGS = {"head", "script", "style", "noscript", "template"}
+
+# Throttling and unavailable servers, the request is tried again later
+TRANSIENT_STATUSES = {429, 502, 503, 504}
+
+
+@functools.lru_cache(maxsize=None)
+def compileSelector(selector):
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(selector, translator="html")
+
+
+def insertTbody(document):
+    # Browsers insert an implicit tbody around table rows, and the scrapers selectors rely on it
+    import lxml.html
+    for table in document.iter("table"):
+        rows = [child for child in table if child.tag == "tr"]
+        if rows:
+            tbody = lxml.html.Element("tbody")
+            rows[0].addprevious(tbody)
+            for row in rows:
+                tbody.append(row)
+    return document
+
+
+def renderText(node):
+    # Approximates WebElement.text: whitespace is collapsed, block elements and <br> break lines
+    chunks = []
+
+    def walk(element):
+        if not isinstance(element.tag, str) or element.tag in HIDDEN_TAGS:
+            return
+        if element.tag == "br":
+            chunks.append("\n")
+        elif element.tag in BLOCK_TAGS:
+            chunks.append("\n")
+        if element.text:
+            chunks.append(element.text)
+        for child in element:
+            walk(child)
+            if child.tail:
+                chunks.append(child.tail)
+        if element.tag in BLOCK_TAGS:
+            chunks.append("\n")
+
+    walk(node)
+    lines = [re.sub(r"[ \t\r\f\v\xa0]+", " ", line).strip() for line in "".join(chunks).split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+class HttpElement:
+    def __init__(self, driver, node):
+        self.driver = driver
+        self.node = node
+
+    @property
+    def text(self):
+        return renderText(self.node)
+
+    @property
+    def tag_name(self):
+        return self.node.tag
+
+    def get_attribute(self, name):
+        return self.node.get(name)
+
+    def _wrap(self, nodes):
+        # XPath can also select text or attribute nodes, which are not elements
+        return [HttpElement(self.driver, node) for node in nodes if isinstance(getattr(node, "tag", None), str)]
+
+    def _first(self, elements, selector):
+        if not elements:
+            raise NoSuchElementException("Unable to locate element: {}".format(selector))
+        return elements[0]
+
+    def find_elements_by_css_selector(self, selector):
+        return self._wrap(compileSelector(selector)(self.node))
+
+    def find_element_by_css_selector(self, selector):
+        return self._first(self.find_elements_by_css_selector(selector), selector)
+
+    def find_elements_by_xpath(self, xpath):
+        return self._wrap(self.node.xpath(xpath))
+
+    def find_element_by_xpath(self, xpath):
+        return self._first(self.find_elements_by_xpath(xpath), xpath)
+
+    def find_element_by_id(self, element_id):
+        return self.find_element_by_xpath("//*[@id='{}']".format(element_id))
+
+    def click(self):
+        # Without javascript, the only thing a click can do is following the enclosing link
+        links = self.node.xpath("ancestor-or-self::a[@href][1]")
+        if not links:
+            raise Exception("Cannot click on a <{}> element without a browser".format(self.node.tag))
+        self.driver.get(urllib.parse.urljoin(self.driver.current_url, links[0].get("href")))
+
+
+class HttpDriver:
+    # Mimics the subset of the WebDriver API used by the read-only scrapers,
+    # fetching pages with a keep-alive HTTP session and parsing them locally.
+    user_agent = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Collecster_completer"
+
+    def __init__(self, session=None, timeout=30, cache=None):
+        if session is None:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = self.user_agent
+        self.session = session
+        self.timeout = timeout
+        self.cache = cache
+        self.current_url = None
+        self.document = None
+
+    def fetch(self, url):
+        cached = self.cache.getPage(url) if self.cache else None
+        if cached:
+            return cached
+        # Only the requests actually sent are rate limited
+        response = scheduler.call(url, self._request, url)
+        # Missing articles are answered with a 404, which is not cached: an article may be created meanwhile,
+        # and missing barcodes are already remembered for a shorter time by the barcode index
+        if self.cache and response.status_code < 400:
+            self.cache.putPage(url, response.url, response.content)
+        return response.url, response.content
+
+    def _request(self, url):
+        import requests
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.Timeout as e:
+            raise TransientError("Timed out loading {}".format(url)) from e
+        except requests.ConnectionError as e:
+            raise TransientError("Could not connect to load {}: {}".format(url, e)) from e
+        if response.status_code in TRANSIENT_STATUSES:
+            retry_after = response.headers.get("Retry-After")
+            raise TransientError("HTTP {} loading {}".format(response.status_code, url),
+                                 float(retry_after) if retry_after and retry_after.isdigit() else None)
+        return response
+
+    def get(self, url):
+        url, content = self.fetch(url)
+        # Search engines answer with an intermediate page instead of a plain HTTP redirect
+        target = self._redirectTarget(url, content.decode("utf-8", "replace"))
+        if target:
+            url, content = self.fetch(target)
+        self.load(url, content)
+
+    def load(self, url, content):
+        # lxml detects the encoding from the raw bytes, honouring the page <meta charset>
+        import lxml.html
+        self.document = insertTbody(lxml.html.document_fromstring(content or b"<html/>", base_url=url))
+        self.current_url = url
+
+    @property
+    def page_source(self):
+        if self.document is None:
+            return None
+        import lxml.html
+        return lxml.html.tostring(self.document, encoding="unicode")
+
+    def _redirectTarget(self, url, source):
+        parsed = urllib.parse.urlparse(url)
+        if parsed.path == "/url":
+            query = urllib.parse.parse_qs(parsed.query)
+            for key in ("q", "url"):
+                if key in query and query[key][0].startswith("http"):
+                    return query[key][0]
+        refresh = re.search(r"<meta[^>]+http-equiv=[\"']?refresh[\"']?[^>]+url=([^\"'>]+)", source or "", re.I)
+        if refresh:
+            return urllib.parse.urljoin(url, refresh.group(1).strip())
+        return None
+
+    def _root(self):
+        if self.document is None:
+            raise NoSuchElementException("No page loaded")
+        return HttpElement(self, self.document)
+
+    def set_page_load_timeout(self, timeout):
+        self.timeout = timeout
+
+    def find_element_by_css_selector(self, selector):
+        return self._root().find_element_by_css_selector(selector)
+
+    def find_elements_by_css_selector(self, selector):
+        return self._root().find_elements_by_css_selector(selector)
+
+    def find_element_by_xpath(self, xpath):
+        return self._root().find_element_by_xpath(xpath)
+
+    def find_elements_by_xpath(self, xpath):
+        return self._root().find_elements_by_xpath(xpath)
+
+    def find_element_by_id(self, element_id):
+        return self._root().find_element_by_id(element_id)
+
+    def quit(self):
+        self.session.close()
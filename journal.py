@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+import json
+import os.path
+import threading
+
+
+class GameProgress:
+    # The journal entry of a single game, updated after each of its stages
+    def __init__(self, journal, key):
+        self.journal = journal
+        self.key = key
+
+    @property
+    def entry(self):
+        return self.journal.get(self.key) or {}
+
+    @property
+    def done(self):
+        return self.entry.get("stage") == "done"
+
+    def update(self, **fields):
+        self.journal.update(self.key, **fields)
+
+    def finish(self, keep=False, **marker):
+        self.journal.finish(self.key, keep, **marker)
+
+
+class Journal:
+    # Progress of the games being recorded, written to disk after each stage, so a run interrupted
+    # in the middle of a game resumes it at the step it stopped at.
+    # An entry has the game "stage", its scrapped "store" with the saved names, and its "pictures".
+    # The pictures of finished games are remembered, so they are not used again by the next runs.
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {"games": {}, "consumed": []}
+        if os.path.exists(path):
+            with open(path) as journal:
+                self.state = json.load(journal)
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Written aside then renamed, so a crash while writing does not lose the previous state
+        with open(self.path + ".tmp", "w") as journal:
+            json.dump(self.state, journal, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+    def game(self, key):
+        return GameProgress(self, str(key))
+
+    def get(self, key):
+        with self.lock:
+            return self.state["games"].get(str(key))
+
+    def pending(self):
+        with self.lock:
+            return [key for key, entry in self.state["games"].items() if entry.get("stage") != "done"]
+
+    def update(self, key, **fields):
+        with self.lock:
+            self.state["games"].setdefault(str(key), {}).update(fields)
+            self._write()
+
+    def finish(self, key, keep=False, **marker):
+        # Only a marker is kept for the games which must not be recorded again, such as batch rows,
+        # with the given fields
+        with self.lock:
+            entry = self.state["games"].pop(str(key), {})
+            self.state["consumed"].extend(entry.get("pictures", []))
+            if keep:
+                self.state["games"][str(key)] = dict(marker, stage="done")
+            self._write()
+
+    def consumed(self):
+        # The pictures of finished games, and the ones reserved by the unfinished games
+        with self.lock:
+            pictures = set(self.state["consumed"])
+            for entry in self.state["games"].values():
+                pictures.update(entry.get("pictures", []))
+            return pictures
+
+    def clear(self):
+        with self.lock:
+            self.state = {"games": {}, "consumed": []}
+            self._write()
@@ -1,31 +1,90 @@
 #!/usr/bin/env python
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.support.ui import WebDriverWait, Select # available since 2.4.0
-from selenium.webdriver.support import expected_conditions as EC # available since 2.26.0
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
+# Only the exceptions of Selenium are imported upfront, the browser support is imported when a mode needs it
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 
 import urllib.parse
 
 from termcolor import colored
 
+from store import Concept, Release, Store, Date, insideOutmostQuotes
+from httpdriver import HttpDriver, compileSelector, insertTbody
+from scrapcache import ScrapCache
+from optionindex import OptionIndex
+from driverpool import DriverPool
+from tabdriver import TabDriver
+from pictures import PicturePipeline
+from profiler import profiler
+from savedindex import SavedIndex
+from journal import Journal
+from records import RecordsFile
+from validation import ValidationError, checkDate, checkBarcode, checkSelect
+from operatorqueue import OperatorQueue
+from scheduler import scheduler, TransientError
+from wikititles import WikipediaTitles, TitleIndex
+from barcodeindex import BarcodeIndex
+from templateregistry import TemplateConfig, TemplateRegistry, TEMPLATES_FOLDER, DEFAULT_TEMPLATE
+
 import argparse
+import asyncio
+import collections
+import concurrent.futures
+import csv
 import glob
 import json
 import os.path
+import re
+import threading
 import time
 
 
+# Readiness conditions are polled often, so a wait returns as soon as its condition holds
+POLL_FREQUENCY = 0.1
+
+# Seconds to wait for a page, set from --timeout
+page_timeout = 30
+
+
 def loadPage(driver, url, parametersDict=None):
     if parametersDict:
         url = url + "?{}".format(urllib.parse.urlencode(parametersDict))
-    driver.get(url)
-    driver.set_page_load_timeout(30)
+    driver.set_page_load_timeout(page_timeout)
+    with profiler.span("load {}".format(urllib.parse.urlsplit(url).netloc)):
+        if isinstance(driver, HttpDriver):
+            # It schedules its own requests, so the pages it has cached are not rate limited
+            driver.get(url)
+        else:
+            scheduler.call(url, browserGet, driver, url)
     return Webpage(driver)
 
 
+def browserGet(driver, url):
+    # Browsers render most failures as an error page, only the ones reported by WebDriver can be retried
+    try:
+        driver.get(url)
+    except TimeoutException as e:
+        raise TransientError("Timed out loading {}".format(url)) from e
+    except WebDriverException as e:
+        if "net::ERR_" in str(e):
+            raise TransientError("Could not load {}: {}".format(url, e)) from e
+        raise
+
+
+def waitUntil(driver, condition, timeout, message=""):
+    from selenium.webdriver.support.ui import WebDriverWait # available since 2.4.0
+    # A tab returns from its commands while its document is unloading, its scripts then fail until the next one
+    ignored = (WebDriverException,) if isinstance(driver, TabDriver) else None
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY, ignored_exceptions=ignored) \
+               .until(condition, message)
+
+
+def networkIdle(driver):
+    # Django admin bundles its own jQuery, pages may also load a global one
+    return driver.execute_script(
+        "return document.readyState == 'complete'"
+        " && !(window.jQuery && window.jQuery.active)"
+        " && !(window.django && django.jQuery && django.jQuery.active);")
+
+
 
 def scrapValue(driver, selector, expectedLabel):
     labelElement = driver.find_element_by_css_selector(selector)
@@ -38,10 +97,9 @@ def scrapValue(driver, selector, expectedLabel):
                        .find_element_by_css_selector("td").text
 
 
-#def waitForElement(driver, selector):
-def waitForTitle(driver, title):
-    # give a good 100h to login
-    WebDriverWait(driver, 360000).until(EC.title_is(title))
+def waitForTitle(driver, title, timeout):
+    from selenium.webdriver.support import expected_conditions as EC # available since 2.26.0
+    waitUntil(driver, EC.title_is(title), timeout, "Title never became '{}'".format(title))
     
 
 def openWindow(driver, url="_blank"):
@@ -54,101 +112,95 @@ def openWindow(driver, url="_blank"):
     driver.execute_script("window.open('', '{}', 'toolbar=1,location=0,menubar=1');".format(url))
 
 
-def insideOutmostQuotes(text):
-    result = text[text.index('"')+1:]
-    result = result[:result.rfind('"')]
-    return result
-
-
 def listFiles(folder, extension):
     return [os.path.abspath(path) for path in glob.glob(os.path.join(folder, "*.{}".format(extension)))]
 
 
-class TemplateConfig:
-    def __init__(self):
-        self.concept = {}
-        self.concept["nature"] = "Game";
-
-        self.release = {}
-        self.release["release_region"] = "EU"
-        self.release["system_specification"] = "Master System cartridge game [NTSC-U, PAL]"
-        self.release["attributes"] = [
-                "[content]self",
-                "[papers]manual",
-                "[packaging]cartridge box",
-                "[packaging]hang on tab",
-                "[packaging]seal brand",
-        ] 
-
-        self.occurrence = {}
-        self.occurrence["origin"] = "Original"
-        self.occurrence["working_condition"] = "Yes"
-        self.occurrence["pictures"] = [
-                {"pictures-{index}-detail": "Front", "pictures-{index}-any_attribute": "[packaging]cartridge box"},
-                {"pictures-{index}-detail": "Back",  "pictures-{index}-any_attribute": "[packaging]cartridge box"},
-                {"pictures-{index}-detail": "Group"},
-                {"pictures-{index}-detail": "Side label", "pictures-{index}-any_attribute": "[packaging]cartridge box"},
-        ] 
-
-        self.scrappers = {
-            "segaretro": {
-                "date-system-title": "Sega Master System",
-            },
-            "giantbomb": {
-                "system-abbreviation": "SMS",
-            }
-        }
-
-
-class Concept:
-    def __init__(self):
-        self.urls = []
-        self.developer = None
-    pass
-
-class Release:
-    def __init__(self):
-        self.publisher = None
-        self.barcode = None
-
-class Store:
-    def __init__(self):
-        self.concept = Concept()
-        self.release = Release()
-
-    def __str__(self):
-        lines = []  
-        for key, value in self.__dict__.items():
-            lines.append("{}: {}".format(key, value.__dict__))
-        return "\n".join(lines)
+class Webpage:
+    # Fills a whole form in a single round trip: inline rows are added first, then each value is set.
+    # Returns the status of each field, "ok" when it was filled.
+    fill_script = """
+        var fields = arguments[0], inlines = arguments[1], report = {};
 
+        function fire(element, type) {
+            element.dispatchEvent(new Event(type, {bubbles: true}));
+        }
 
-class Date:
-    def __init__(self, value):
-        blocks = value.split("-")
-        if len(blocks) == 3:
-            self.partial_date = value
-            self.precision = "Day"
-        elif len(blocks) == 2:
-            self.partial_date = "{}-01".format(value)
-            self.precision = "Month"
-        elif len(blocks) == 1:
-            self.partial_date = "{}-01-01".format(value)
-            self.precision = "Year"
+        function fill(element, value) {
+            if (!element) return "missing";
+            if (element.tagName == "SELECT") {
+                for (var i = 0; i < element.options.length; ++i) {
+                    if (element.options[i].text.trim() == value) {
+                        element.options[i].selected = true;
+                        fire(element, "change");
+                        return "ok";
+                    }
+                }
+                return "no such option";
+            }
+            if (element.tagName == "INPUT" || element.tagName == "TEXTAREA") {
+                // Browsers do not let scripts choose the file to upload
+                if (element.type == "file") return "file input";
+                element.value = value;
+                fire(element, "input");
+                fire(element, "change");
+                return "ok";
+            }
+            // Radio buttons, the element is their container
+            var labels = element.querySelectorAll("label");
+            for (var i = 0; i < labels.length; ++i) {
+                var input = labels[i].querySelector("input");
+                if (input && labels[i].textContent.trim() == value) {
+                    input.click();
+                    return "ok";
+                }
+            }
+            return "no such choice";
+        }
 
-    def __repr__(self):
-        return "{}({})".format(self.partial_date, self.precision)
+        inlines.forEach(function(inline) {
+            var body = document.querySelector(inline.table);
+            if (!body) {
+                report[inline.table] = "missing";
+                return;
+            }
+            // The last form row is the empty form template
+            var count = body.querySelectorAll("tr.form-row").length - 1;
+            var add = body.querySelector(".add-row > td > a");
+            for (; add && count < inline.size; ++count) {
+                add.click();
+            }
+            inline.selectors.forEach(function(selector, index) {
+                report[selector] = fill(body.querySelector(selector), inline.values[index]);
+            });
+        });
 
-    def fill(self, webpage):
-        webpage.setText("partial_date", self.partial_date)
-        webpage.setRadio("partial_date_precision", self.precision)
+        for (var id in fields) {
+            report[id] = fill(document.getElementById(id), fields[id]);
+        }
+        return report;
+    """
+
+    select_options_script = """
+        var options = {};
+        arguments[0].forEach(function(id) {
+            var element = document.getElementById(id);
+            if (element) {
+                options[id] = element.tagName != "SELECT" ? null : Array.prototype.map.call(
+                    element.options, function(option) { return option.text.trim(); });
+            }
+        });
+        return options;
+    """
 
+    # An OptionIndex, shared by all the pages of a session, used to match select values
+    options = None
 
-class Webpage:
     def __init__(self, driver):
         self.driver = driver
         
-    def _fieldNameToId(self, name):
+    @staticmethod
+    def _fieldNameToId(name):
        return "id_{}".format(name.lower().replace(" ", "_")) 
 
     def _checkValue(self, field_name, value):
@@ -166,29 +218,93 @@ class Webpage:
         element.send_keys(value)
 
     def fillSelect(self, element, value):
+        from selenium.webdriver.support.ui import Select # available since 2.4.0
         Select(element).select_by_visible_text(value)
 
     def setText(self, field_name, value):
         self.fillText(self.findField(field_name), self._checkValue(field_name, value))
 
     def setSelect(self, field_name, value):
-        try:
-            self.fillSelect(self.findField(field_name), self._checkValue(field_name, value))
-        except NoSuchElementException:
-            print(colored("Unable to fill {}, please complete it manually".format(field_name), "yellow"))
-            return False
-        return True
+        return self.fillForm({field_name: value}).get(field_name) == "ok"
 
-    def requireSelect(self, field_name, value):
+    def requireSelect(self, field_name, value, interactive=True):
         if not self.setSelect(field_name, value):
-            input("Please manually fill {} then press a to resume processing...".format(field_name))
+            if not interactive:
+                raise Exception("Unable to fill required field {} with '{}'".format(field_name, value))
+            prompt("Please manually fill {} then press a to resume processing...".format(field_name))
 
     def setRadio(self, field_name, value):
         self.findField(field_name).find_element_by_xpath("./label[normalize-space(text()) = '{}']/input".format(value)).click()
 
     def dictToFields(self, dictionary):
-        for key, value in dictionary.items():
-            self.setText(key, value)
+        self.fillForm(dictionary)
+
+    def fillForm(self, fields, inlines=()):
+        # inlines are dictionaries with the "table" and "field" of an inline (as in Collecster.concept),
+        # and either its "values", or only the "size" it should be extended to.
+        names = {}
+        values = {}
+        report = {}
+        for field_name, value in fields.items():
+            if value is None:
+                report[field_name] = "no value"
+                continue
+            names[self._fieldNameToId(field_name)] = field_name
+            values[self._fieldNameToId(field_name)] = self._checkValue(field_name, value)
+
+        if self.options is not None:
+            with profiler.span("resolve options"):
+                self._resolveOptions(values)
+
+        inline_specs = []
+        for inline in inlines:
+            inline_values = [self._checkValue(inline["field"], value) for value in inline.get("values", [])]
+            inline_specs.append({
+                "table": inline["table"],
+                "size": inline.get("size", len(inline_values)),
+                "selectors": [inline["field"].format(index=index) for index in range(len(inline_values))],
+                "values": inline_values,
+            })
+
+        with profiler.span("fill form"):
+            applied = self._applyFill(values, inline_specs)
+        for key, status in applied.items():
+            report[names.get(key, key)] = status
+
+        for field_name, status in report.items():
+            if status != "ok":
+                print(colored("Unable to fill {} ({}), please complete it manually".format(field_name, status),
+                              "yellow"))
+        return report
+
+    def _applyFill(self, values, inline_specs):
+        return self.driver.execute_script(self.fill_script, values, inline_specs)
+
+    def _selectOptions(self, field_ids):
+        # Returns the labels of the present fields, None for the ones which are not selects
+        return self.driver.execute_script(self.select_options_script, field_ids)
+
+    def selectIds(self):
+        return [element.get_attribute("id") for element in self.driver.find_elements_by_css_selector("select[id]")]
+
+    def _resolveOptions(self, values):
+        # Replaces the values of select fields with the option label they match in the index
+        unknown = [field_id for field_id in values if not self.options.known(field_id)]
+        if unknown:
+            for field_id, labels in self._selectOptions(unknown).items():
+                self.options.load(field_id, labels)
+
+        for field_id, value in values.items():
+            if not self.options.isSelect(field_id):
+                continue
+            label = self.options.resolve(field_id, value)
+            if label is None:
+                # The option may have been added since the snapshot
+                self.options.load(field_id, self._selectOptions([field_id]).get(field_id, []))
+                label = self.options.resolve(field_id, value)
+            if label is not None and label != value:
+                print(colored("Field {}: '{}' matched to option '{}'".format(field_id, value, label), "yellow"))
+                values[field_id] = label
 
     def extendInlines(self, table_body_selector, requested_size):
         table_body = self.driver.find_element_by_css_selector(table_body_selector)
@@ -213,40 +329,293 @@ class Webpage:
     def submit(self, form_id):
         self.driver.find_element_by_id(form_id).submit()
 
+    def waitNetworkIdle(self, timeout):
+        waitUntil(self.driver, networkIdle, timeout, "Page still loading after {}s".format(timeout))
+
+    def waitSelectPopulated(self, field_name, timeout):
+        # A select filled by AJAX only has its empty choice until the response is received
+        script = "var select = document.getElementById(arguments[0]); return !!select && select.options.length > 1;"
+        waitUntil(self.driver, lambda driver: driver.execute_script(script, self._fieldNameToId(field_name)),
+                  timeout, "Select {} was not populated after {}s".format(field_name, timeout))
+
+
+class AdminForm(Webpage):
+    # Same interface as Webpage for a Django admin form, which is filled and posted over HTTP instead.
+    # Form data is kept as a dictionary of name -> list of values, as it will be posted.
+
+    def __init__(self, session, url):
+        self.session = session
+        self.url = url
+        self.files = {}
+        # Values of the required selects, the dependent forms are rendered from them
+        self.initial = {}
+        self.load()
+
+    def load(self, params=None):
+        import lxml.html
+        response = self.session.get(self.url, params)
+        self.document = lxml.html.document_fromstring(response.content, base_url=response.url)
+        # Pages without a form, such as the admin index, behave as an empty one
+        forms = self.document.xpath("//form[@id]") or self.document.forms or [lxml.html.fromstring("<form></form>")]
+        self.form = forms[0]
+        self.action = urllib.parse.urljoin(response.url, self.form.get("action") or response.url)
+
+        self.data = {}
+        for name, value in self.form.form_values():
+            self.data.setdefault(name, []).append(value)
+
+        self.choices = {}
+        for select in self.form.xpath(".//select[@name]"):
+            self.choices[select.get("name")] = {option.text_content().strip(): option.get("value", option.text_content())
+                                                for option in select.xpath(".//option")}
+        for radio in self.form.xpath(".//input[@type='radio'][@name]"):
+            label = radio.xpath("ancestor::label[1]")
+            text = label[0].text_content().strip() if label else radio.get("value")
+            self.choices.setdefault(radio.get("name"), {})[text] = radio.get("value")
+
+    def _templateName(self, name):
+        # Inline rows added in the browser are copies of the empty form, which has a __prefix__ index
+        return re.sub(r"-\d+-", "-__prefix__-", name)
+
+    def _findByName(self, name):
+        elements = self.form.xpath(".//*[@name=$name]", name=name) \
+                   or self.form.xpath(".//*[@name=$name]", name=self._templateName(name))
+        return elements[0] if elements else None
+
+    def _fieldNameFromId(self, element_id):
+        elements = self.form.xpath(".//*[@id=$id]", id=element_id)
+        if elements:
+            if elements[0].get("name"):
+                return elements[0].get("name")
+            # Radio buttons, the element is their container
+            inputs = elements[0].xpath(".//input[@name]")
+            return inputs[0].get("name") if inputs else None
+        # A row of an inline that would have been added by the browser
+        name = element_id[len("id_"):]
+        prefix = name.split("-")[0]
+        if re.match(r"[\w]+-\d+-\w+$", name) and "{}-TOTAL_FORMS".format(prefix) in self.data:
+            return name
+        return None
+
+    def _fill(self, element_id, value):
+        name = self._fieldNameFromId(element_id)
+        if not name:
+            return "missing"
+        options = self.choices.get(name, self.choices.get(self._templateName(name)))
+        if options is not None:
+            if value not in options:
+                return "no such option"
+            value = options[value]
+        self.data[name] = [value]
+        return "ok"
+
+    def _applyFill(self, values, inline_specs):
+        report = {}
+        for inline in inline_specs:
+            # Django renders each inline inside an element with the "<prefix>-group" id
+            prefix = re.search(r"#([\w]+)-group", inline["table"])
+            total = prefix and "{}-TOTAL_FORMS".format(prefix.group(1))
+            if total not in self.data:
+                report[inline["table"]] = "missing"
+                continue
+            self.data[total] = [str(max(int(self.data[total][0]), inline["size"]))]
+            for selector, value in zip(inline["selectors"], inline["values"]):
+                report[selector] = self._fill(selector.lstrip("#"), value)
+
+        for element_id, value in values.items():
+            report[element_id] = self._fill(element_id, value)
+        return report
+
+    def setText(self, field_name, value):
+        name = self._fieldNameFromId(self._fieldNameToId(field_name))
+        element = name and self._findByName(name)
+        if element is not None and element.get("type") == "file":
+            self.files[name] = value
+        else:
+            self.fillForm({field_name: value})
+
+    def _selectOptions(self, field_ids):
+        options = {}
+        for field_id in field_ids:
+            elements = self.form.xpath(".//*[@id=$id]", id=field_id)
+            if elements:
+                options[field_id] = list(self.choices[elements[0].get("name")]) \
+                                    if elements[0].tag == "select" else None
+        return options
+
+    def selectIds(self):
+        return [element.get("id") for element in self.form.xpath(".//select[@id]")]
+
+    def setSelect(self, field_name, value):
+        if not super().setSelect(field_name, value):
+            return False
+        name = self._fieldNameFromId(self._fieldNameToId(field_name))
+        self.initial[name] = self.data[name][0]
+        return True
+
+    def requireSelect(self, field_name, value, interactive=True):
+        # There is no browser window in which the operator could fill the field
+        super().requireSelect(field_name, value, interactive=False)
+
+    def waitNetworkIdle(self, timeout):
+        pass
+
+    def waitSelectPopulated(self, field_name, timeout):
+        # The admin renders the dependent forms server side when the required values are given as initial data
+        if self._fieldNameFromId(self._fieldNameToId(field_name)) is None:
+            self.load(self.initial)
+            if self._fieldNameFromId(self._fieldNameToId(field_name)) is None:
+                raise Exception("Field {} is not available in {}".format(field_name, self.url))
+
+    def submit(self, form_id):
+        data = [(name, value) for name, values in self.data.items() for value in values]
+        data.append(("_save", "Save"))
+        files = {name: open(path, "rb") for name, path in self.files.items()}
+        try:
+            self.session.post(self.action, data, files, referer=self.url)
+        finally:
+            for file in files.values():
+                file.close()
+
+
+class AdminSession:
+    # A logged in HTTP session to the Django admin, used in place of a WebDriver to submit Collecster forms
+    def __init__(self, timeout=30):
+        import requests
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=8)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.timeout = timeout
+        self.response = None
+
+    def _keep(self, response):
+        response.raise_for_status()
+        self.response = response
+        return response
+
+    def get(self, url, params=None):
+        return self._keep(self.http.get(url, params=params, timeout=self.timeout))
+
+    def post(self, url, data, files=None, referer=None):
+        # Django checks the referer of secure POST requests, on top of the CSRF token found in the form data
+        return self._keep(self.http.post(url, data=data, files=files or None, timeout=self.timeout,
+                                         headers={"Referer": referer or url}))
+
+    def open(self, url):
+        return AdminForm(self, url)
+
+    def find(self, selector):
+        import lxml.html
+        document = lxml.html.document_fromstring(self.response.content)
+        elements = compileSelector(selector)(document)
+        return elements[0].text_content().strip() if elements else None
+
+    @property
+    def title(self):
+        return self.find("title")
+
+    # Cookies are exchanged in the WebDriver format, so sessions are saved and restored the same way
+
+    def get_cookies(self):
+        return [{"name": cookie.name, "value": cookie.value, "path": cookie.path, "domain": cookie.domain,
+                 "secure": cookie.secure} for cookie in self.http.cookies]
+
+    def add_cookie(self, cookie):
+        domain = urllib.parse.urlsplit(self.response.url).hostname if self.response else ""
+        self.http.cookies.set(cookie["name"], cookie["value"], path=cookie.get("path", "/"),
+                              domain=cookie.get("domain", domain), secure=cookie.get("secure", False))
+
+    def quit(self):
+        self.http.close()
+
 
 class SegaRetro:
     # The nested table is not always inside the same tr index
     # Hopefully, it will always be the only nested table
     #date_selector = "#mw-content-text > div:nth-child(2) > table > tbody tr > td > table > tbody"
     date_selector = "#mw-content-text > div > table.breakout > tbody tr > td > table > tbody"
-    
+    origin = "https://segaretro.org"
+    # Release dates of the last parsed pages, by URL
+    parsed_pages = collections.OrderedDict()
+    parsed_pages_size = 32
+    # Resolves the barcodes to their article title before any page load, when set
+    barcodes = None
+
     def __init__(self, config):
         self.config = config.scrappers["segaretro"]
 
-    def lookup(self, driver, lookup_value):
-        loadPage(driver, "https://segaretro.org/index.php?title={}".format(lookup_value))
-        try:
-            driver.find_element_by_css_selector("div.noarticletext")
-            return None
-        except NoSuchElementException:
-            return driver.current_url
+    def lookup(self, driver, lookup_value, barcode=None):
+        lookups = [lookup_value]
+        title = None
+        if barcode and self.barcodes:
+            # A barcode SegaRetro recently did not know is not looked up again
+            if self.barcodes.isMissing(barcode):
+                print(colored("Barcode {} is not known by SegaRetro, enter the game name instead".format(barcode),
+                              "yellow"))
+                return None
+            # A known barcode is looked up by its title, the barcode is only tried if the title is not found
+            title = self.barcodes.find(barcode)
+            if title:
+                lookups.insert(0, title)
+        for value in lookups:
+            loadPage(driver, self.origin + "/index.php", {"title": value})
+            try:
+                driver.find_element_by_css_selector("div.noarticletext")
+            except NoSuchElementException:
+                return driver.current_url
+        # The title of an indexed barcode is kept, it may only be missing from the site for now
+        if barcode and self.barcodes and not title:
+            self.barcodes.recordMissing(barcode)
+        return None
 
     def scrapCurrentPage(self, driver, store):
         store.concept.name = driver.find_element_by_css_selector("#p-cactions > h2").text
         store.concept.urls.append(driver.current_url)
-        store.release.date = Date(self.readDate(driver))
+        store.release.date = self.readDate(driver)
         return store
 
     def readDate(self, driver):
-        dateRow = driver.find_element_by_css_selector(self.date_selector) \
-                    .find_element_by_xpath("tr/td[text() = ' FR ']/div/a[@title='{}']/../../.."
-                        .format(self.config["date-system-title"]))
-        value = dateRow.find_element_by_css_selector("span[itemprop=datePublished]").text
-        # Dates on Sega Retro can be followed by a number between square brackets. We get rid of this suffix.
-        if "[" in value:
-            return value[:value.index("[")]
-        else:
-            return value
+        region = self.config["date-region"]
+        system = self.config["date-system-title"]
+        date = self.releaseDates(driver).get(region, {}).get(system)
+        if date is None:
+            raise NoSuchElementException("No {} release date for {} on {}".format(region, system, driver.current_url))
+        return date
+
+    def releaseDates(self, driver):
+        # The whole page is parsed at once, so reading other regions or systems costs no further lookup
+        url = driver.current_url
+        dates = self.parsed_pages.get(url)
+        if dates is None:
+            dates = self.parseReleaseDates(driver.page_source)
+            self.parsed_pages[url] = dates
+            while len(self.parsed_pages) > self.parsed_pages_size:
+                self.parsed_pages.popitem(last=False)
+        return dates
+
+    @classmethod
+    def parseReleaseDates(cls, page_source):
+        # Returns {region: {system title: Date}} from the release breakout table
+        import lxml.html
+        document = insertTbody(lxml.html.fromstring(page_source))
+        dates = {}
+        region = None
+        for table_body in compileSelector(cls.date_selector)(document):
+            for row in table_body.iterchildren("tr"):
+                cells = row.findall("td")
+                published = row.xpath(".//span[@itemprop='datePublished']")
+                if not cells or not published:
+                    continue
+                # A region spanning several rows is only named on the first one
+                region = "".join(cells[0].xpath("text()")).strip() or region
+                # Dates on Sega Retro can be followed by a number between square brackets. We get rid of this suffix.
+                value = "".join(published[0].itertext()).split("[")[0].strip()
+                if not region or not re.match(r"^\d{4}(-\d{2}){0,2}$", value):
+                    continue
+                for system in cells[0].xpath("div/a/@title"):
+                    dates.setdefault(region, {}).setdefault(system, Date(value))
+        return dates
 
 
 class Wikipedia:
@@ -254,10 +623,27 @@ class Wikipedia:
                   " > tr > th > a[title=\"Video game developer\"]"
     publisherSelector = "#mw-content-text > div > table.infobox.hproduct > tbody" \
                         " > tr > th > a[title=\"Video game publisher\"]"
+    search_url = "https://www.google.fr/search"
+    # Resolves the article titles without going through the search engine, when set
+    titles = None
+
+    def __init__(self, config):
+        self.config = config.scrappers["wikipedia"]
 
     def openName(self, driver, store):
+        if self.titles:
+            try:
+                title = self.titles.resolve(store.concept.name, self.config["title-systems"])
+            except Exception as e:
+                print(colored("Could not resolve the Wikipedia title of {}: {}".format(store.concept.name, e),
+                              "yellow"))
+                title = None
+            if title:
+                loadPage(driver, self.titles.url(title))
+                return
+        # The search engine finds the articles not following the usual titles
         loadPage(driver,
-                 "https://www.google.fr/search",
+                 self.search_url,
                  {
                     "q": "{} site:{}".format(store.concept.name+" (video game)", "en.wikipedia.org"),
                     "btnI": "I",
@@ -281,6 +667,7 @@ class GiantBomb:
 
     def __init__(self, config):
         self.config = config.scrappers["giantbomb"]
+        self.platform_xpath = config.giantbomb_platform_xpath
 
     def openName(self, driver, store):
         loadPage(driver, self.origin + "/search",
@@ -289,9 +676,12 @@ class GiantBomb:
                     "q": store.concept.name,
                  })
 
-        xpath = "//span[@class=\"search-platform\"][contains(text(), \"{platform}\")]"
-        driver.find_element_by_xpath(xpath.format(platform=self.config["system-abbreviation"])) \
-                .click()
+        search_url = driver.current_url
+        driver.find_element_by_xpath(self.platform_xpath).click()
+        if not isinstance(driver, HttpDriver):
+            # A browser tab returns from the click before the game page is loaded
+            waitUntil(driver, lambda driver: driver.current_url != search_url and networkIdle(driver), page_timeout,
+                      "Game page not loaded after {}s".format(page_timeout))
 
     def scrapValues(self, driver, store):
         # Just a check that will throw is the found page is not what was expected
@@ -323,190 +713,1189 @@ class Collecster:
         }
     }
     success_selector = "#container > ul.messagelist > li.success"
-
-    def __init__(self, config):
+    error_selector = "#container p.errornote"
+    # Selects only rendered once a required value is chosen, with the select whose choices they share,
+    # against which they are checked when they could not be snapshotted
+    shared_options = {"id_software-0-publisher": "id_developer"}
+    # Forms snapshotted with a value of their required select picked, which renders their dependent selects
+    dependent_selects = {"occurrence/add/": ("Release", "operationalocc-0-working_condition")}
+
+    def __init__(self, config, interactive=True, timeout=30, operator_timeout=360000, options=None):
         self.config = config
-
+        self.options = options
+        # When not interactive, forms are submitted automatically and nothing waits for the operator
+        self.interactive = interactive
+        self.timeout = timeout
+        self.operator_timeout = operator_timeout
+        self.page = None
+
+    def openPage(self, driver, path):
+        # Forms are either driven in a browser, or posted directly through an AdminSession
+        if isinstance(driver, AdminSession):
+            self.page = driver.open(self.domain + path)
+        else:
+            self.page = loadPage(driver, self.domain + path)
+        self.page.options = self.options
+        return self.page
+
+    def conceptForm(self, concept):
+        # The values of each form, as (fields, inlines) given to fillForm
+        return ({
+            "Distinctive name": concept.name,
+            "Primary nature": self.config.concept["nature"],
+            "Developer": concept.developer,
+        }, [dict(self.concept["urls"], values=concept.urls)])
+
+    def releaseForm(self, store):
+        fields = store.release.date.formFields()
+        fields.update({
+            "Barcode": store.release.barcode,
+            "Release regions": self.config.release["release_region"],
+            "System specification": self.config.release["system_specification"],
+            "software-0-publisher": store.release.publisher,
+        })
+        return fields, [dict(self.release["attributes"], values=self.config.release["attributes"])]
+
+    def occurrenceForm(self):
+        return {
+            "Origin": self.config.occurrence["origin"],
+            "operationalocc-0-working_condition": self.config.occurrence["working_condition"],
+        }, []
 
     def prefillConcept(self, driver, concept):
-        addConcept = loadPage(driver, self.domain+"concept/add/")
-        addConcept.setText("Distinctive name", concept.name)
-        addConcept.setSelect("Primary nature", self.config.concept["nature"])
-        addConcept.setSelect("Developer", concept.developer)
-        addConcept.setInlines(self.concept["urls"], concept.urls)
+        addConcept = self.openPage(driver, "concept/add/")
+        return addConcept.fillForm(*self.conceptForm(concept))
 
     def prefillRelease(self, driver, store):
-        addRelease = loadPage(driver, self.domain+"release/add/")
-        addRelease.requireSelect("Concept", store.concept.saved_name)
-        time.sleep(1) # Naive wait for AJAX
-        store.release.date.fill(addRelease)
-        addRelease.setText("Barcode", store.release.barcode)
-        addRelease.setSelect("Release regions", self.config.release["release_region"])
-        addRelease.setSelect("System specification", self.config.release["system_specification"])
-        addRelease.setInlines(self.release["attributes"], self.config.release["attributes"])
-        addRelease.setSelect("software-0-publisher", store.release.publisher)
+        addRelease = self.openPage(driver, "release/add/")
+        addRelease.requireSelect("Concept", store.concept.saved_name, self.interactive)
+        # Selecting the concept loads the nature specific forms, including the software publisher
+        with profiler.span("wait ajax"):
+            addRelease.waitNetworkIdle(self.timeout)
+            addRelease.waitSelectPopulated("software-0-publisher", self.timeout)
+        return addRelease.fillForm(*self.releaseForm(store))
 
     def prefillOccurrence(self, driver, store, file_iterator):
-        addOccurrence = loadPage(driver, self.domain+"occurrence/add/")
-        addOccurrence.requireSelect("Release", store.release.saved_name)
-        time.sleep(1) # Naive wait for AJAX
-        addOccurrence.setSelect("Origin", self.config.occurrence["origin"])
-        addOccurrence.setSelect("operationalocc-0-working_condition", self.config.occurrence["working_condition"])
-
-        input("Press enter to insert pictures...")
-        addOccurrence.extendInlines(self.occurrence["pictures"]["table"], len(self.config.occurrence["pictures"]))
-        for index, picture_guide in enumerate(self.config.occurrence["pictures"]):
+        addOccurrence = self.openPage(driver, "occurrence/add/")
+        addOccurrence.requireSelect("Release", store.release.saved_name, self.interactive)
+        with profiler.span("wait ajax"):
+            addOccurrence.waitNetworkIdle(self.timeout)
+            addOccurrence.waitSelectPopulated("operationalocc-0-working_condition", self.timeout)
+        report = addOccurrence.fillForm(*self.occurrenceForm())
+
+        if self.interactive:
+            prompt("Press enter to insert pictures...")
+        report.update(addOccurrence.fillForm(
+            dict(self.config.picture_fields),
+            [dict(self.occurrence["pictures"], size=len(self.config.occurrence["pictures"]))]))
+        # File inputs can only be filled by sending keys
+        for index in range(len(self.config.occurrence["pictures"])):
             addOccurrence.setText("pictures-{index}-image_file".format(index=index), file_iterator.__next__())
-            for field, value in picture_guide.items():
-                addOccurrence.setSelect(field.format(index=index), value)
-
-    def login(self, driver, login_filepath):
-        login = loadPage(driver, self.domain)
+        return report
+
+    def snapshotOptions(self, driver, path):
+        # The options of all the selects of a form, so the values can be checked before any form is filled.
+        # Selects rendered only once a required value is chosen are snapshotted when their form is filled,
+        # unless the form has dependent_selects and a value can be picked.
+        if self.options is None or path in self.options.forms:
+            return
+        page = self.openPage(driver, path)
+        for field_id, labels in page._selectOptions(page.selectIds()).items():
+            self.options.load(field_id, labels)
+        if path in self.dependent_selects:
+            required, dependent = self.dependent_selects[path]
+            labels = self.options.selects.get(page._fieldNameToId(required))
+            if labels and labels.exact:
+                try:
+                    page.requireSelect(required, sorted(labels.exact)[0], interactive=False)
+                    page.waitNetworkIdle(self.timeout)
+                    page.waitSelectPopulated(dependent, self.timeout)
+                    for field_id, labels in page._selectOptions(page.selectIds()).items():
+                        self.options.load(field_id, labels)
+                except Exception as e:
+                    # The dependent selects are then checked from the next game on, once a form was filled
+                    print(colored("Could not snapshot the options of {}: {}".format(dependent, e), "yellow"))
+        self.options.forms.add(path)
+
+    def validate(self, driver, store, concept_name=None, release_name=None):
+        # Checks the values of the forms which will be submitted, against the Collecster options.
+        # Returns the problems, which would leave a form half filled, and the warnings.
+        problems = []
+        warnings = []
+        fields, inlines = self.occurrenceForm()
+        forms = [("occurrence/add/", dict(fields, **self.config.picture_fields), inlines)]
+        if not release_name:
+            problems.extend(checkBarcode(store.release.barcode))
+            date_problems = checkDate(getattr(store.release, "date", None))
+            problems.extend(date_problems)
+            if not date_problems:
+                forms.insert(0, ("release/add/",) + self.releaseForm(store))
+        if not (concept_name or release_name):
+            if not getattr(store.concept, "name", None):
+                problems.append("Distinctive name: missing")
+            forms.insert(0, ("concept/add/",) + self.conceptForm(store.concept))
+
+        for path, fields, inlines in forms:
+            with profiler.span("snapshot options"):
+                self.snapshotOptions(driver, path)
+                # The selects sharing their choices with another form need its snapshot
+                if path == "release/add/":
+                    self.snapshotOptions(driver, "concept/add/")
+            for field_name, value in fields.items():
+                if value is None:
+                    continue
+                values = str(value).split("\n")
+                if len(values) > 1:
+                    warnings.append("{}: '{}' will be used, among {}".format(field_name, values[0], values))
+                # The rows of an inline have the same options, only its first row may be rendered yet
+                field_id = re.sub(r"-\d+-", "-0-", Webpage._fieldNameToId(field_name))
+                if self.options is not None and not self.options.isSelect(field_id):
+                    field_id = self.shared_options.get(field_id, field_id)
+                problems.append(checkSelect(self.options, field_id, field_name, values[0]))
+            # Inline values are filled as is, without matching them to an option
+            for inline in inlines:
+                field_id = inline["field"].format(index=0).lstrip("#")
+                for index, value in enumerate(inline.get("values", [])):
+                    problems.append(checkSelect(self.options, field_id, inline["field"].format(index=index), value,
+                                                exact=True))
+        return [problem for problem in problems if problem], warnings
+
+    def restoreSession(self, driver, cookies_path):
+        # A browser kept from a previous run may still be logged in, otherwise the saved cookies are tried
+        self.openPage(driver, "")
+        if driver.title == self.homeTitle:
+            return True
+        if not os.path.exists(cookies_path):
+            return False
+        for cookie in json.load(open(cookies_path)):
+            driver.add_cookie({key: cookie[key] for key in ("name", "value", "path", "secure") if key in cookie})
+        self.openPage(driver, "")
+        return driver.title == self.homeTitle
+
+    def saveSession(self, driver, cookies_path):
+        os.makedirs(os.path.dirname(cookies_path) or ".", exist_ok=True)
+        # Session cookies grant access to the account, they are only readable by their owner
+        with os.fdopen(os.open(cookies_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as cookies:
+            json.dump(driver.get_cookies(), cookies)
+
+    def login(self, driver, login_filepath, cookies_path=None):
+        if cookies_path and self.restoreSession(driver, cookies_path):
+            return
+        login = self.openPage(driver, "")
         if os.path.exists(login_filepath):
             credentials = json.load(open(login_filepath))
             login.dictToFields(credentials)
             login.submit("login-form")
-        waitForTitle(driver, self.homeTitle)
+
+        if isinstance(driver, AdminSession):
+            if driver.title != self.homeTitle:
+                raise Exception("Could not log in Collecster with the credentials from {}".format(login_filepath))
+        else:
+            # Without credentials, the operator logs in manually
+            waitForTitle(driver, self.homeTitle,
+                         self.timeout if os.path.exists(login_filepath) else self.operator_timeout)
+        if cookies_path:
+            self.saveSession(driver, cookies_path)
 
     def waitSuccessConfirmation(self, driver):
-        WebDriverWait(driver, 360000).until(EC.text_to_be_present_in_element(
-            (By.CSS_SELECTOR, self.success_selector), "was added successfully"))
-        success_text = driver.find_element_by_css_selector(self.success_selector).text
-        return insideOutmostQuotes(success_text)
+        if isinstance(driver, AdminSession):
+            success_text = driver.find(self.success_selector)
+            if not success_text or "was added successfully" not in success_text:
+                raise Exception("Collecster rejected the form: {}".format(driver.find(self.error_selector)))
+            return insideOutmostQuotes(success_text)
+
+        # The operator may take a while to review a form, an automatic submission should be answered quickly
+        timeout = self.operator_timeout if self.interactive else self.timeout
+        script = ("var success = document.querySelector(arguments[0]);"
+                  "if (success && success.textContent.indexOf('was added successfully') != -1)"
+                  "    return ['success', success.textContent.trim()];"
+                  "var error = document.querySelector(arguments[1]);"
+                  "return error ? ['error', error.textContent.trim()] : null;")
+
+        def outcome(driver):
+            result = driver.execute_script(script, self.success_selector, self.error_selector)
+            # The operator can correct a rejected form, an automatic submission cannot
+            if result and (result[0] == "success" or not self.interactive):
+                return result
+            return None
 
+        status, text = waitUntil(driver, outcome, timeout, "No confirmation after {}s".format(timeout))
+        if status == "error":
+            raise Exception("Collecster rejected the form: {}".format(text))
+        return insideOutmostQuotes(text)
+
+    def save(self, driver, model):
+        # The operator reviews and saves the prefilled form, unless running unattended
+        with profiler.span("save {}".format(model)):
+            if not self.interactive:
+                self.page.submit("{}_form".format(model))
+            saved_name = self.waitSuccessConfirmation(driver)
+        # The new object can be selected in the next forms
+        if self.options is not None:
+            self.options.add("id_{}".format(model), saved_name)
+        return saved_name
+
+
+# Scrapers run concurrently, so their prompts must not interleave on the console
+prompt_lock = threading.Lock()
+# Set while the asynchronous pipeline runs, to queue the prompts of all the games in flight
+prompt_queue = None
+
+def prompt(message):
+    profiler.count("operator prompts")
+    with profiler.span("operator"):
+        if prompt_queue:
+            return prompt_queue.askFromThread(message)
+        with prompt_lock:
+            return input(message)
+
+
+# Text of the pages served instead of the requested one when a site throttles or fails
+ERROR_PAGE_MARKERS = ("too many requests", "rate limit", "service unavailable", "bad gateway", "gateway timeout",
+                      "internal server error", "err_")
+
+
+def pageErrored(driver):
+    # A throttling, server error or network error page is worth loading again, a page without the scrapped
+    # values is not: it is the wrong article, which a reload would not change
+    try:
+        if (driver.current_url or "").startswith("chrome-error://"):
+            return True
+        text = driver.title + " " + driver.execute_script(
+            "return document.body ? document.body.innerText.substring(0, 500) : '';")
+    except WebDriverException:
+        return True
+    return any(marker in text.lower() for marker in ERROR_PAGE_MARKERS)
 
-def retryScrap(driver, website, website_name, store):
+
+def retryScrap(driver, website, website_name, store, interactive=True):
     scrap_on = True
+    attempt = 0
     while scrap_on:
         try:
             website.scrapValues(driver, store)
-            scrap_on = False #No exception thrown means scraping was successful
+            return True #No exception thrown means scraping was successful
         except Exception as e:
-            command = input("Scrapping failed from {} window.".format(website_name) +
-                            " Try navigation manually to the right page then press enter, or type 's' to skip...")
+            profiler.count("failed scraps {}".format(website_name))
+            # A browser may be showing a throttling or error page, it is loaded again before bothering the operator
+            if attempt < scheduler.retries and not isinstance(driver, HttpDriver) and driver.current_url \
+                    and pageErrored(driver):
+                time.sleep(scheduler.delay(attempt))
+                attempt += 1
+                try:
+                    loadPage(driver, driver.current_url)
+                except Exception:
+                    pass
+                continue
+            if not interactive:
+                print(colored("Scrapping failed from {}: {}".format(website_name, e), "yellow"))
+                return False
+            command = prompt("Scrapping failed from {} window.".format(website_name) +
+                             " Try navigation manually to the right page then press enter, paste its URL,"
+                             " or type 's' to skip...")
             scrap_on = (command != "s")
+            # Without a browser window, the right page can only be provided by its URL
+            if command.startswith("http"):
+                loadPage(driver, command)
+    return False
 
 
-def recordGame(driver, handles, config, args, file_iterator, barcode=None, lookup=None):
+def scrapSegaRetro(driver, config, lookup, barcode=None):
     store = Store()
-    if barcode:
-        store.release.barcode = barcode
-        lookup = barcode
-
-    driver.switch_to_window(handles["segaretro"])
     segaRetro = SegaRetro(config)
-    if (not lookup) or (not segaRetro.lookup(driver, lookup)):
-        return False
+    if not segaRetro.lookup(driver, lookup, barcode):
+        return None
     segaRetro.scrapCurrentPage(driver, store)
+    if barcode and segaRetro.barcodes:
+        segaRetro.barcodes.record(barcode, store.concept.name)
+    return store
 
-    if not args.skip_wikipedia:
-        driver.switch_to_window(handles["wikipedia"])
-        wikipedia = Wikipedia()
-        wikipedia.openName(driver, store)
-        retryScrap(driver, wikipedia, "Wikipedia", store)
-    else:
-        store.concept.developer = input("Please enter developer: ")
-        store.release.publisher = input("Please enter publisher: ")
-
-    if args.verbose:
-        print(store)
-
+def scrapWikipedia(driver, config, name, interactive=True):
+    store = Store()
+    store.concept.name = name
+    wikipedia = Wikipedia(config)
+    wikipedia.openName(driver, store)
+    return store if retryScrap(driver, wikipedia, "Wikipedia", store, interactive) else None
 
-    driver.switch_to_window(handles["giantbomb"])
+def scrapGiantBomb(driver, config, name, interactive=True):
+    store = Store()
+    store.concept.name = name
     giantbomb = GiantBomb(config)
     giantbomb.openName(driver, store)
-    retryScrap(driver, giantbomb, "GiantBomb", store)
+    return store if retryScrap(driver, giantbomb, "GiantBomb", store, interactive) else None
+
+
+def cachedScrap(cache, source, lookup, scrap, *args):
+    # Only complete scraping results are cached, so a skipped source is attempted again on next run
+    if cache:
+        fields = cache.getFields(source, lookup)
+        if fields:
+            profiler.count("cache hits {}".format(source))
+            return Store.fromDict(fields)
+    with profiler.span("scrap {}".format(source)):
+        store = scrap(*args)
+    if cache and store:
+        cache.putFields(source, lookup, store.toDict())
+    return store
+
+
+def scrapKey(config, lookup):
+    # The scrapped values depend on the template, such as the region and system of the release date
+    return "{}|{}".format(lookup, config.name)
+
+
+def mergeScraped(store, segaretro, wikipedia, giantbomb):
+    store.concept.name = segaretro.concept.name
+    store.release.date = segaretro.release.date
+    # Keeps the order of the serial scraping: Wikipedia, SegaRetro, then GiantBomb
+    for source in (wikipedia, segaretro, giantbomb):
+        if source:
+            store.concept.urls.extend(source.concept.urls)
+    if wikipedia:
+        store.concept.developer = wikipedia.concept.developer
+        store.release.publisher = wikipedia.release.publisher
+    return store
+
+
+def scrapSources(drivers, config, args, store, lookup, cache=None):
+    # Each source is scraped by its own driver, so the page loads happen at the same time
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        # Bound to the profiler, the scraping time is attributed to the current game
+        scrap = profiler.bind(cachedScrap)
+        segaretro = executor.submit(scrap, cache, "segaretro", scrapKey(config, lookup),
+                                    scrapSegaRetro, drivers["segaretro"], config, lookup, store.release.barcode)
+
+        # A barcode has to be resolved to a name by SegaRetro before the other sources can be searched,
+        # unless it is already indexed
+        name = lookup
+        if store.release.barcode:
+            name = SegaRetro.barcodes.find(store.release.barcode) if SegaRetro.barcodes else None
+            if not name:
+                if not segaretro.result():
+                    return None
+                name = segaretro.result().concept.name
+
+        wikipedia = None
+        if not args.skip_wikipedia:
+            wikipedia = executor.submit(scrap, cache, "wikipedia", scrapKey(config, name),
+                                        scrapWikipedia, drivers["wikipedia"], config, name, not args.unattended)
+        giantbomb = executor.submit(scrap, cache, "giantbomb", scrapKey(config, name),
+                                    scrapGiantBomb, drivers["giantbomb"], config, name, not args.unattended)
+
+        if not segaretro.result():
+            return None
+        return mergeScraped(store,
+                            segaretro.result(),
+                            wikipedia.result() if wikipedia else None,
+                            giantbomb.result())
+
+
+def savedKeys(config, store, model):
+    # What a concept or release of the store is found by in the SavedIndex
+    keys = {
+        "barcode": store.release.barcode,
+        "names": [store.concept.name] if getattr(store.concept, "name", None) else [],
+        "urls": [url for url in store.concept.urls if url.startswith(SegaRetro.origin)],
+    }
+    if model == "release":
+        keys["specification"] = config.release["system_specification"]
+        keys["region"] = config.release["release_region"]
+    return keys
+
+
+def resumedGame(config, progress=None, scrapped=None):
+    # A game interrupted after its scraping is resumed from the journal
+    if progress and progress.entry.get("store"):
+        print("Resuming {} from the journal, at stage '{}'".format(progress.key, progress.entry.get("stage")))
+        return Store.fromDict(progress.entry["store"])
+    # A game scrapped beforehand, by a dry run, is not scrapped again
+    if scrapped:
+        if progress:
+            progress.update(stage="scrapped", store=scrapped, template=config.name)
+        return Store.fromDict(scrapped)
+    return None
+
+
+def newGame(barcode=None, lookup=None):
+    # Returns the store of a game to scrap, and what it is looked up by
+    store = Store()
+    if barcode:
+        store.release.barcode = barcode
+        lookup = barcode
+    elif lookup:
+        store.concept.name = lookup
+    return store, lookup
 
-    driver.switch_to_window(handles["collecster"])
 
-    if (not args.concept) and (not args.release):
-        collecster.prefillConcept(driver, store.concept)
-        store.concept.saved_name = collecster.waitSuccessConfirmation(driver)
+def alreadySaved(config, store, saved):
+    # Further copies of a saved release only need an occurrence, which is filled from the configuration
+    if saved and saved.find("release", **savedKeys(config, store, "release")):
+        print("Already saved, the game is not scrapped again")
+        return True
+    return False
+
+
+def scrappedGame(config, args, store, cache=None, progress=None, reported=True):
+    if args.verbose and reported:
+        print(store)
+        if cache:
+            print(cache.report())
+    if progress:
+        progress.update(stage="scrapped", store=store.toDict(), template=config.name)
+    return store
+
+
+def scrapGame(drivers, config, args, barcode=None, lookup=None, cache=None, saved=None, progress=None,
+              scrapped=None):
+    resumed = resumedGame(config, progress, scrapped)
+    if resumed:
+        return resumed
+    store, lookup = newGame(barcode, lookup)
+    if not lookup:
+        return None
+
+    saved_release = alreadySaved(config, store, saved)
+    if not saved_release:
+        with profiler.span("scrap game"):
+            if not scrapSources(drivers, config, args, store, lookup, cache):
+                return None
+
+        if args.skip_wikipedia and not args.unattended:
+            store.concept.developer = prompt("Please enter developer: ")
+            store.release.publisher = prompt("Please enter publisher: ")
+
+    return scrappedGame(config, args, store, cache, progress, not saved_release)
+
+
+def submitGame(driver, config, args, store, pictures, concept_name=None, release_name=None, options=None,
+               saved=None, progress=None, validate=True):
+    # Forms posted over HTTP cannot be reviewed by the operator
+    interactive = not (args.unattended or isinstance(driver, AdminSession))
+    collecster = Collecster(config, interactive, args.timeout, args.operator_timeout, options)
+
+    # The index is looked up again once scrapped, a previous game may have been saved meanwhile
+    if saved and not (concept_name or release_name):
+        concept_name = saved.find("concept", **savedKeys(config, store, "concept"))
+        release_name = saved.find("release", **savedKeys(config, store, "release"))
+    # Names saved before an interruption
+    concept_name = concept_name or getattr(store.concept, "saved_name", None)
+    release_name = release_name or getattr(store.release, "saved_name", None)
+
+    # The whole game is checked before any form is submitted, its problems are reported at once
+    journaled_pictures = progress.entry.get("pictures") if progress else None
+    with profiler.span("validate"):
+        problems, warnings = collecster.validate(driver, store, concept_name, release_name)
+    if not journaled_pictures and len(pictures) < len(config.occurrence["pictures"]):
+        problems.append("Pictures: {} left, {} are required for an occurrence".format(
+                            len(pictures), len(config.occurrence["pictures"])))
+    for warning in warnings:
+        print(colored(warning, "yellow"))
+    if problems and validate:
+        raise ValidationError(problems)
+
+    # Invalid pictures are detected before anything is created.
+    # A resumed game takes the same pictures again.
+    with profiler.span("pictures"):
+        sources, picture_files = pictures.takeGroup(journaled_pictures, len(config.occurrence["pictures"]))
+    if progress:
+        progress.update(pictures=sources)
+
+    if (not concept_name) and (not release_name):
+        with profiler.span("prefill concept"):
+            collecster.prefillConcept(driver, store.concept)
+        store.concept.saved_name = collecster.save(driver, "concept")
     else:
-        store.concept.saved_name = args.concept
+        store.concept.saved_name = concept_name
     print("Saved concept name: {}".format(store.concept.saved_name))
-
-    if not args.release:
-        collecster.prefillRelease(driver, store)
-        store.release.saved_name = collecster.waitSuccessConfirmation(driver)
+    if saved and store.concept.saved_name:
+        saved.record("concept", store.concept.saved_name, **savedKeys(config, store, "concept"))
+    if progress:
+        progress.update(stage="concept", store=store.toDict())
+
+    if not release_name:
+        with profiler.span("prefill release"):
+            collecster.prefillRelease(driver, store)
+        store.release.saved_name = collecster.save(driver, "release")
     else:
-        store.release.saved_name = args.release
+        store.release.saved_name = release_name
     print("Saved release name: {}".format(store.release.saved_name))
+    if saved:
+        saved.record("release", store.release.saved_name, **savedKeys(config, store, "release"))
+    if progress:
+        progress.update(stage="release", store=store.toDict())
+
+    with profiler.span("prefill occurrence"):
+        collecster.prefillOccurrence(driver, store, iter(picture_files))
+    collecster.save(driver, "occurrence")
+
+    return store
+
+
+def gameKey(lookup, dry_run=False):
+    # Journal key of a game entered by the operator, a dry run of the game does not count as having recorded it
+    return "{}{}".format("dry-run " if dry_run else "", lookup)
+
+
+def pendingGames(journal, dry_run=False):
+    # The lookups of the games entered by the operator and left unfinished, by a dry run or by a real one
+    lookups = []
+    for key in journal.pending():
+        if key.startswith("batch ") or key.startswith("dry-run ") != dry_run:
+            continue
+        lookups.append(key[len("dry-run "):] if dry_run else key)
+    return lookups
+
+
+def recordGame(drivers, config, args, pictures, barcode=None, lookup=None, cache=None, options=None, saved=None,
+               journal=None, records=None):
+    # Names given by the operator take precedence over the index
+    if args.concept or args.release:
+        saved = None
+    progress = journal.game(gameKey(barcode or lookup, bool(records))) if journal else None
+    with profiler.game(barcode or lookup):
+        store = scrapGame(drivers, config, args, barcode, lookup, cache, saved, progress)
+        if not store:
+            return False
+        # A dry run only writes the scrapped values, they are submitted later from the records
+        if records:
+            records.write({"barcode": barcode, "name": lookup, "concept": args.concept, "release": args.release},
+                          config, store)
+        else:
+            try:
+                submitGame(drivers["collecster"], config, args, store, pictures, args.concept, args.release, options,
+                           saved, progress)
+            except ValidationError as e:
+                if args.unattended:
+                    raise
+                print(colored("\n".join(["The game has {} problem(s):".format(len(e.problems))] + e.problems), "red"))
+                if prompt("Submit it anyway, to complete the forms manually? (y/N) ").strip().lower() != "y":
+                    raise
+                submitGame(drivers["collecster"], config, args, store, pictures, args.concept, args.release, options,
+                           saved, progress, validate=False)
+        if progress:
+            progress.finish()
+        return True
+
+
+def readManifest(path, jsonl=False):
+    # Rows have 'barcode' or 'name', and optionally 'template', 'pictures', 'concept' and 'release' columns
+    with open(path, newline="") as manifest:
+        if jsonl or path.endswith(".jsonl"):
+            for line in manifest:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(manifest)
+
+
+def checkTemplates(templates, manifest, jsonl=False):
+    # The templates of all the rows are checked before the batch starts, instead of failing in the middle of it
+    for index, row in enumerate(readManifest(manifest, jsonl), 1):
+        try:
+            templates.get(row.get("template"))
+        except Exception as e:
+            raise Exception("Row {} of {}: {}".format(index, manifest, e))
+
+
+def splitTemplate(entry):
+    # An interactive entry may end with the template of the game, as in "Alex Kidd @master-system-eu"
+    lookup, separator, template = entry.rpartition(" @")
+    return (lookup.strip(), template.strip()) if separator else (entry, None)
+
+
+def gameLabel(index, row):
+    return "{} {}".format(index, row.get("barcode") or row.get("name"))
+
 
-    collecster.prefillOccurrence(driver, store, file_iterator)
-    collecster.waitSuccessConfirmation(driver)
+def batchKey(manifest, index, dry_run=False):
+    # Journal key of a manifest row, a dry run of the manifest does not count as having recorded it
+    return "batch {}{}#{}".format("dry-run " if dry_run else "", os.path.abspath(manifest), index)
 
-    return True
+
+def resultsPath(args, dry_run=False):
+    # A dry run does not overwrite the results of the real batch
+    return args.batch_results or "{}.{}.csv".format(os.path.splitext(args.batch)[0],
+                                                   "dry-run" if dry_run else "results")
+
+
+def reviewQueue(args):
+    # The batch games which did not pass the validation, with their problems. Once corrected, the file
+    # is submitted with --from-records.
+    return RecordsFile(args.review or "{}.review.jsonl".format(os.path.splitext(args.batch)[0]))
+
+
+def rowProgress(args, index, journal=None, records=None):
+    # Rows are journaled by their position in the manifest, the finished ones are kept to be skipped
+    return journal.game(batchKey(args.batch, index, bool(records))) if journal else None
+
+
+def rowPictures(args, row, pictures, picture_pipeline, journal=None, records=None):
+    # A row with its own pictures subfolder has them prepared along with the scraping
+    if row.get("pictures") and not records:
+        return picture_pipeline.stage(os.path.join(args.picturefolder, row["pictures"]),
+                                      journal.consumed() if journal else ())
+    return pictures
+
+
+def rowNames(args, row, saved=None):
+    # Returns the concept and release names of a row, and the index its names are looked up in.
+    # Names given in the manifest or on the command line take precedence over the index.
+    concept_name = row.get("concept") or args.concept
+    release_name = row.get("release") or args.release
+    return concept_name, release_name, None if concept_name or release_name else saved
+
+
+def doneStatus(progress):
+    # A row finished by a previous run was either saved, or sent to review to be submitted from the review file
+    if progress.entry.get("review"):
+        return "sent to review {} by a previous run".format(progress.entry["review"])
+    return "saved by a previous run"
+
+
+def rowResult(index, row, config, store=None, status=None, review=None, error=None, progress=None):
+    # The outcome of a manifest row, with the columns of the batch results
+    result = {key: row.get(key) for key in ("barcode", "name", "pictures")}
+    result["row"] = index
+    result["status"] = status
+    if isinstance(error, ValidationError):
+        print(colored("Row {} needs a review, {}".format(index, error), "yellow"))
+        if review:
+            review.write(dict(row, problems=error.problems), config, store)
+            # The row is submitted from the review file once corrected, not again from the manifest
+            if progress:
+                progress.finish(keep=True, review=review.path)
+        result["status"] = "review"
+        result["error"] = str(error)
+    elif error:
+        print(colored("Row {} failed: {}".format(index, error), "red"))
+        result["status"] = "failed"
+        result["error"] = str(error)
+
+    if store:
+        result["concept"] = getattr(store.concept, "saved_name", None)
+        result["release"] = getattr(store.release, "saved_name", None)
+    return result
+
+
+def runBatch(drivers, templates, args, pictures, picture_pipeline, cache=None, options=None, saved=None,
+             journal=None, records=None):
+    results_path = resultsPath(args, bool(records))
+    columns = ["row", "barcode", "name", "pictures", "status", "concept", "release", "error"]
+    review = reviewQueue(args)
+
+    with open(results_path, "w", newline="") as results_file, \
+         concurrent.futures.ThreadPoolExecutor(max_workers=1) as scraper:
+        results = csv.DictWriter(results_file, columns)
+        results.writeheader()
+
+        def prepare(index, row):
+            progress = rowProgress(args, index, journal, records)
+            if progress and progress.done:
+                return None, None, progress
+            row_pictures = rowPictures(args, row, pictures, picture_pipeline, journal, records)
+            with profiler.game(gameLabel(index, row)):
+                return (scraper.submit(profiler.bind(scrapGame), drivers, templates.get(row.get("template")), args,
+                                       row.get("barcode") or None, row.get("name") or None, cache,
+                                       rowNames(args, row, saved)[2], progress, row.get("store")),
+                        row_pictures, progress)
+
+        rows = enumerate(readManifest(args.batch, bool(args.from_records)), 1)
+        pending = next(rows, None)
+        preparing = pending and prepare(*pending)
+        while pending:
+            index, row = pending
+            current, row_pictures, progress = preparing
+            # The next game is scraped while the current one is submitted to Collecster
+            pending = next(rows, None)
+            preparing = pending and prepare(*pending)
+
+            config = templates.get(row.get("template"))
+            store = None
+            status = None
+            error = None
+            try:
+                if not current:
+                    status = doneStatus(progress)
+                elif not current.result():
+                    status = "not found"
+                elif records:
+                    store = current.result()
+                    records.write(row, config, store)
+                    status = "scrapped"
+                else:
+                    store = current.result()
+                    concept_name, release_name, row_saved = rowNames(args, row, saved)
+                    with profiler.game(gameLabel(index, row)):
+                        submitGame(drivers["collecster"], config, args, store, row_pictures, concept_name,
+                                   release_name, options, row_saved, progress)
+                    status = "saved"
+                if store and progress:
+                    progress.finish(keep=True)
+            except Exception as e:
+                error = e
+
+            results.writerow(rowResult(index, row, config, store, status, review, error, progress))
+            results_file.flush()
+
+    review.close()
+    print("Batch results written to {}".format(results_path))
+    if review.file:
+        print("Games to review written to {}".format(review.path))
+
+
+class AsyncPipeline:
+    # Records many games at once: each game is a coroutine, the blocking scrapers and form submissions
+    # run on executor threads with their own drivers from the pool.
+    # Each site has a bounded number of concurrent requests, Collecster forms are submitted one at a time
+    # through the logged in session.
+
+    def __init__(self, drivers, templates, args, pictures, picture_pipeline, cache=None, options=None, saved=None,
+                 journal=None, site_concurrency=2, records=None, review=None):
+        self.drivers = drivers
+        self.templates = templates
+        self.args = args
+        self.pictures = pictures
+        self.picture_pipeline = picture_pipeline
+        self.cache = cache
+        self.options = options
+        self.saved = saved
+        self.journal = journal
+        self.records = records
+        self.review = review
+        self.semaphores = {role: asyncio.Semaphore(site_concurrency) for role in ("segaretro", "wikipedia", "giantbomb")}
+        self.semaphores["collecster"] = asyncio.Semaphore(1)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=3 * site_concurrency + 1)
+        self.operator = None
+
+    async def _blocking(self, label, function, *args):
+        # The profiler spans and the prompts are attributed to the game, on whichever thread runs it
+        def run():
+            with profiler.game(label):
+                return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, run)
+
+    async def _scrap(self, label, role, source, lookup, scrap, *args):
+        async with self.semaphores[role]:
+            driver = self.drivers.acquire(role)
+            try:
+                return await self._blocking(label, cachedScrap, self.cache, source, lookup, scrap, driver, *args)
+            finally:
+                self.drivers.release(role, driver)
+
+    async def scrapSegaRetro(self, label, config, lookup, barcode=None):
+        return await self._scrap(label, "segaretro", "segaretro", scrapKey(config, lookup), scrapSegaRetro, config,
+                                 lookup, barcode)
+
+    async def scrapWikipedia(self, label, config, name):
+        return await self._scrap(label, "wikipedia", "wikipedia", scrapKey(config, name), scrapWikipedia, config,
+                                 name, not self.args.unattended)
+
+    async def scrapGiantBomb(self, label, config, name):
+        return await self._scrap(label, "giantbomb", "giantbomb", scrapKey(config, name), scrapGiantBomb, config,
+                                 name, not self.args.unattended)
+
+    async def scrapGame(self, label, config, barcode=None, lookup=None, saved=None, progress=None, scrapped=None):
+        # Same steps as scrapGame, each source being scrapped as soon as its site has a free slot
+        resumed = resumedGame(config, progress, scrapped)
+        if resumed:
+            return resumed
+        store, lookup = newGame(barcode, lookup)
+        if not lookup:
+            return None
+
+        saved_release = alreadySaved(config, store, saved)
+        if not saved_release:
+            name = lookup
+            segaretro = asyncio.ensure_future(self.scrapSegaRetro(label, config, lookup, barcode))
+            # A barcode has to be resolved to a name by SegaRetro before the other sources can be searched,
+            # unless it is already indexed
+            if barcode:
+                name = SegaRetro.barcodes.find(barcode) if SegaRetro.barcodes else None
+                if not name:
+                    if not await segaretro:
+                        return None
+                    name = segaretro.result().concept.name
+            wikipedia = None
+            if not self.args.skip_wikipedia:
+                wikipedia = asyncio.ensure_future(self.scrapWikipedia(label, config, name))
+            giantbomb = asyncio.ensure_future(self.scrapGiantBomb(label, config, name))
+
+            # The other scrapers are not cancelled, their drivers are only released once they are done
+            wikipedia = (await wikipedia) if wikipedia else None
+            giantbomb = await giantbomb
+            if not await segaretro:
+                return None
+            mergeScraped(store, segaretro.result(), wikipedia, giantbomb)
+
+            if self.args.skip_wikipedia and not self.args.unattended:
+                store.concept.developer = await self.operator.ask("Please enter developer: ", label)
+                store.release.publisher = await self.operator.ask("Please enter publisher: ", label)
+
+        return scrappedGame(config, self.args, store, self.cache, progress, not saved_release)
+
+    async def submitGame(self, label, config, store, pictures, concept_name=None, release_name=None, saved=None,
+                         progress=None):
+        async with self.semaphores["collecster"]:
+            return await self._blocking(label, submitGame, self.drivers["collecster"], config, self.args, store,
+                                        pictures, concept_name, release_name, self.options, saved, progress)
+
+    async def recordRow(self, index, row):
+        # Returns the result of a manifest row, with the columns of the batch results
+        label = gameLabel(index, row)
+        config = self.templates.get(row.get("template"))
+        progress = rowProgress(self.args, index, self.journal, self.records)
+        if progress and progress.done:
+            return rowResult(index, row, config, status=doneStatus(progress))
+
+        pictures = rowPictures(self.args, row, self.pictures, self.picture_pipeline, self.journal, self.records)
+        concept_name, release_name, saved = rowNames(self.args, row, self.saved)
+        store = None
+        status = None
+        error = None
+        try:
+            store = await self.scrapGame(label, config, row.get("barcode") or None, row.get("name") or None, saved,
+                                         progress, row.get("store"))
+            if not store:
+                status = "not found"
+            elif self.records:
+                self.records.write(row, config, store)
+                status = "scrapped"
+            else:
+                await self.submitGame(label, config, store, pictures, concept_name, release_name, saved, progress)
+                status = "saved"
+            if store and progress:
+                progress.finish(keep=True)
+        except Exception as e:
+            error = e
+        return rowResult(index, row, config, store, status, self.review, error, progress)
+
+    async def runBatch(self, rows, results, in_flight):
+        # Results are written as the rows finish, the row column gives their manifest order
+        slots = asyncio.Semaphore(in_flight)
+
+        global prompt_queue
+        self.operator = OperatorQueue(asyncio.get_running_loop())
+        self.operator.start()
+        prompt_queue = self.operator
+        try:
+            async def record(index, row):
+                async with slots:
+                    results(await self.recordRow(index, row))
+
+            await asyncio.gather(*(record(index, row) for index, row in rows))
+        finally:
+            prompt_queue = None
+            self.operator.close()
+            self.executor.shutdown(wait=True)
+
+
+def runBatchAsync(drivers, templates, args, pictures, picture_pipeline, cache=None, options=None, saved=None,
+                  journal=None, records=None):
+    results_path = resultsPath(args, bool(records))
+    columns = ["row", "barcode", "name", "pictures", "status", "concept", "release", "error"]
+
+    with open(results_path, "w", newline="") as results_file:
+        writer = csv.DictWriter(results_file, columns)
+        writer.writeheader()
+        lock = threading.Lock()
+
+        def write(result):
+            with lock:
+                writer.writerow(result)
+                results_file.flush()
+
+        review = reviewQueue(args)
+        pipeline = AsyncPipeline(drivers, templates, args, pictures, picture_pipeline, cache, options, saved, journal,
+                                 args.site_concurrency, records, review)
+        rows = enumerate(readManifest(args.batch, bool(args.from_records)), 1)
+        asyncio.run(pipeline.runBatch(rows, write, args.in_flight))
+
+    review.close()
+    print("Batch results written to {}".format(results_path))
+    if review.file:
+        print("Games to review written to {}".format(review.path))
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Adhoc templating for Collecster")
-    parser.add_argument("picturefolder", help="A folder containing the pictures to be added to Occurrences.")
+    parser.add_argument("picturefolder", nargs="?",
+                        help="A folder containing the pictures to be added to Occurrences. Not used by --dry-run.")
 
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("--barcode", type=int, help="The game barcode.")
     group.add_argument('--name', help="The game name.")
     group.add_argument('--interactive', action="store_true",
                        help="Launch in interactive mode, where the application ask for barcodes in a loop.")
+    group.add_argument("--batch", metavar="MANIFEST",
+                       help="A CSV (or .jsonl) file listing the games to record, one per row, with 'barcode' or"
+                            " 'name' and optionally 'template', 'pictures' (a subfolder of picturefolder), 'concept',"
+                            " 'release'.")
+    group.add_argument("--from-records", metavar="RECORDS",
+                       help="Submits the games of a --dry-run records file, without scraping them again."
+                            " It is processed as a batch manifest.")
+
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only scraps the games, without Collecster nor pictures: each game is written to the"
+                             " --output records file as soon as it is scrapped, to be submitted with --from-records.")
+    parser.add_argument("--output", metavar="RECORDS",
+                        help="With --dry-run, the JSON lines file the scrapped games are appended to.")
+
+    parser.add_argument("--in-flight", type=int, default=1,
+                        help="Number of batch games recorded at once. Above 1, the games are scrapped concurrently"
+                             " by an asynchronous pipeline, and their forms submitted one at a time.")
+    parser.add_argument("--site-concurrency", type=int, default=2,
+                        help="With --in-flight, the maximum number of concurrent requests to each scrapped website.")
+    parser.add_argument("--batch-results",
+                        help="The CSV file where the batch outcome of each row is written."
+                             " Defaults to the manifest name with a .results.csv extension,"
+                             " or .dry-run.csv for a --dry-run.")
+    parser.add_argument("--review", metavar="RECORDS",
+                        help="The JSON lines file where the batch games with problems are written instead of being"
+                             " submitted, to be corrected and submitted with --from-records."
+                             " Defaults to the manifest name with a .review.jsonl extension.")
+    parser.add_argument("--unattended", action="store_true",
+                        help="Never wait for the operator: forms are submitted automatically,"
+                             " and failures are reported instead of prompted.")
+
+    parser.add_argument("--timeout", type=float, default=30,
+                        help="Seconds to wait for a page, an AJAX update or an automatic submission.")
+    parser.add_argument("--operator-timeout", type=float, default=360000,
+                        help="Seconds to wait for the operator to log in or to save a form.")
 
     parser.add_argument("--credentials-file", default="credentials.json", 
                         help="A JSON file with 'username' and 'password' keys")
+    parser.add_argument("--templates", default=TEMPLATES_FOLDER, metavar="FOLDER",
+                        help="The folder of the platform templates, JSON (or YAML) files giving the system, attributes,"
+                             " picture guides and scrapper settings of the games. A template is named after its file.")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE,
+                        help="The template of the games which do not name one. In interactive mode, an entry can end"
+                             " with ' @TEMPLATE', and batch rows can have a 'template' column.")
     parser.add_argument("--concept", help="If a concept name is given, no concept will be created.")
     parser.add_argument("--release", help="If a release name is given, no concept nor release will be created.")
 
     parser.add_argument("-s", "--skip-wikipedia", action="store_true", help="Prevents the Wikipedia scrapper.")
-
+    parser.add_argument("--scraper-backend", choices=["browser", "http"], default="browser",
+                        help="'http' fetches the scrapped websites without a browser,"
+                             " Chrome is then only used for Collecster.")
+    parser.add_argument("--headless", action="store_true",
+                        help="Runs Chrome without windows. The login has to be automatic, from the credentials file.")
+    parser.add_argument("--tabs", action="store_true",
+                        help="Opens the browser windows as tabs of a single Chrome, instead of one Chrome each."
+                             " With --in-flight, every game in flight gets its own tabs: while a tab waits on its"
+                             " page or on Collecster, the steps of the other games go on in theirs. As each command"
+                             " brings its tab to the front, it requires --unattended or --headless.")
+    parser.add_argument("--keep-browsers", action="store_true",
+                        help="Leaves Chrome running at exit, and reuses the browsers left running by the previous run.")
+    parser.add_argument("--submitter", choices=["browser", "http"], default="browser",
+                        help="'http' posts Collecster forms directly, without a browser nor operator review."
+                             " It requires the credentials file.")
+
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Times a page is loaded again after a transient failure (throttling, server or network"
+                             " error), waiting longer each time, before giving up or asking the operator.")
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="HOST=RATE",
+                        help="Maximum requests per second to a host, for example segaretro.org=0.5."
+                             " The scrapped websites have conservative defaults. Can be repeated.")
+
+    parser.add_argument("--picture-size", type=int, default=1600,
+                        help="Pictures larger than this many pixels are downscaled before upload, 0 to never resize.")
+    parser.add_argument("--picture-quality", type=int, default=85,
+                        help="JPEG quality of the downscaled pictures.")
+
+    parser.add_argument("--wikipedia-titles", metavar="DUMP",
+                        help="The dump of all the English Wikipedia titles (enwiki-latest-all-titles-in-ns0.gz),"
+                             " indexed once to resolve the articles offline. Otherwise the titles are checked"
+                             " online, in a single request per game.")
+    parser.add_argument("--google-wikipedia", action="store_true",
+                        help="Finds the Wikipedia articles with the search engine 'I'm feeling lucky',"
+                             " instead of resolving their title.")
+
+    parser.add_argument("--state-dir", default=".collecster",
+                        help="The folder where the scrapping cache and other persistent states are stored.")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch the scrapped websites again.")
+    parser.add_argument("--cache-ttl", type=float, default=30*24,
+                        help="Hours after which a cached page or scrapped value is fetched again.")
+    parser.add_argument("--cache-size", type=float, default=200,
+                        help="Size in megabytes above which the least recently used cache entries are evicted.")
+
+    parser.add_argument("--import-barcodes", action="append", default=[], metavar="CSV",
+                        help="A CSV file of 'barcode' and 'title' columns, the SegaRetro article titles of EAN or UPC"
+                             " barcodes, added to the barcode index. Can be repeated.")
+
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Forgets the games left unfinished by the previous run, and the pictures it used,"
+                             " instead of resuming them.")
+    parser.add_argument("--always-create", action="store_true",
+                        help="Creates a new concept and release even for the games already saved by previous runs,"
+                             " instead of only adding an occurrence to them.")
+
+    parser.add_argument("--profile", metavar="TRACE_FILE",
+                        help="Times each stage of the games: the per-game trace is written to this JSON"
+                             " (or .csv) file, and a summary of the stages durations is printed at exit.")
     parser.add_argument("-v", "--verbose", action="store_true",
-                        help="Prints the store content as it was scrapped from the sources.")
+                        help="Prints the store content as it was scrapped from the sources, and cache statistics.")
 
     args = parser.parse_args()
-
-    # Create Chrome driver
-    driver = webdriver.Chrome()
-
-    windowCount = 4
+    # Each command brings its tab to the front, an operator could not review a form
+    if args.tabs and not (args.unattended or args.headless):
+        parser.error("--tabs requires --unattended or --headless")
+    if args.dry_run and not args.output:
+        parser.error("--dry-run requires --output")
+    if args.dry_run and args.from_records:
+        parser.error("--from-records submits the records of a previous --dry-run")
+    if not (args.dry_run or args.picturefolder):
+        parser.error("the picturefolder is required, except by --dry-run")
+    # Records are submitted as the rows of a manifest
+    if args.from_records:
+        args.batch = args.from_records
+    profiler.enabled = bool(args.profile)
+
+    # One independent driver per website, so the scrapers can load their pages concurrently
+    roles = ["collecster", "segaretro", "wikipedia", "giantbomb"]
     if (args.skip_wikipedia):
-        windowCount -= 1
-
-    for i in range(windowCount-1):
-        openWindow(driver)
-    handles = {
-        "collecster": driver.window_handles[0],
-        "segaretro":  driver.window_handles[1],
-        "wikipedia":  driver.window_handles[2],
-        "giantbomb":  driver.window_handles[3],
-    } 
-
-    config = TemplateConfig()
-
-    file_iterator = iter(listFiles(args.picturefolder, "jpg"))
+        roles.remove("wikipedia")
+    if args.dry_run:
+        roles.remove("collecster")
+    # Records are submitted without being scrapped, no scrapper browser is started
+    if args.from_records:
+        roles = ["collecster"]
+
+    # Requests to the scrapped websites are spaced according to each host limit
+    scheduler.retries = args.retries
+    for url, rate in ((SegaRetro.origin, 1), (Wikipedia.search_url, 0.5), (GiantBomb.origin, 1)):
+        scheduler.rates[urllib.parse.urlsplit(url).netloc] = rate
+    for limit in args.rate_limit:
+        host, rate = limit.split("=")
+        scheduler.rates[host] = float(rate)
+
+    # Every page load is bounded by --timeout, in a browser as over HTTP
+    page_timeout = args.timeout
+
+    cache = None
+    if not args.no_cache:
+        cache = ScrapCache(os.path.join(args.state_dir, "cache.sqlite"),
+                           ttl=args.cache_ttl*3600, max_size=int(args.cache_size*1024*1024))
+
+    # Concepts and releases saved by any run, so another copy of a game only adds an occurrence.
+    # A dry run scraps every game, the records may be submitted to another Collecster.
+    saved = None
+    if not (args.always_create or args.dry_run):
+        saved = SavedIndex(os.path.join(args.state_dir, "saved.sqlite"))
+
+    # Each game progress is journaled, so an interrupted run resumes where it stopped
+    journal = Journal(os.path.join(args.state_dir, "journal.json"))
+    if args.no_resume:
+        journal.clear()
+
+    # Barcodes found by the previous runs or imported are resolved to their title without a lookup
+    SegaRetro.barcodes = BarcodeIndex(os.path.join(args.state_dir, "barcodes.sqlite"))
+    for path in args.import_barcodes:
+        print("Imported {} barcode(s) from {}".format(SegaRetro.barcodes.importList(path), path))
+
+    if not args.google_wikipedia:
+        title_index = None
+        if args.wikipedia_titles:
+            index_path = os.path.join(args.state_dir, "wikipedia-titles.sqlite")
+            if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(args.wikipedia_titles):
+                print("Indexing the Wikipedia titles, this is only done once per dump...")
+                TitleIndex.build(args.wikipedia_titles, index_path)
+            title_index = TitleIndex(index_path)
+        Wikipedia.titles = WikipediaTitles(title_index, cache, timeout=args.timeout)
+
+    def createDriver(role):
+        if role == "collecster" and args.submitter == "http":
+            return AdminSession(args.timeout)
+        if role != "collecster" and args.scraper_backend == "http":
+            return HttpDriver(timeout=args.timeout, cache=cache)
+        return drivers.chrome(role)
+
+    drivers = DriverPool(createDriver, args.headless,
+                         os.path.join(args.state_dir, "browsers.json") if args.keep_browsers else None, args.tabs)
+    drivers.warmUp(roles)
+
+    # Templates are parsed and validated once, each game then uses its own
+    templates = TemplateRegistry(args.templates, args.template)
+    config = templates.get()
+    if args.batch:
+        # Records files are JSON lines whatever their extension
+        checkTemplates(templates, args.batch, bool(args.from_records))
+    # Collecster select options are looked up once per session
+    options = OptionIndex()
+
+    # Pictures are validated and downscaled in the background, in groups of one per occurrence picture of the game
+    picture_pipeline = PicturePipeline(len(config.occurrence["pictures"]), args.picture_size, args.picture_quality)
+    pictures = None
+    if args.picturefolder and not args.dry_run:
+        pictures = picture_pipeline.stage(args.picturefolder, journal.consumed())
+    records = RecordsFile(args.output) if args.dry_run else None
 
     try:
-        collecster = Collecster(config)
-        collecster.login(driver, args.credentials_file)
+        if not args.dry_run:
+            collecster = Collecster(config, not args.unattended, args.timeout, args.operator_timeout)
+            with profiler.span("login"):
+                collecster.login(drivers["collecster"], args.credentials_file,
+                                 os.path.join(args.state_dir, "cookies.json"))
 
         if args.barcode or args.name:
-            if recordGame(driver, handles, config, args, file_iterator, args.barcode, args.name):
+            if recordGame(drivers, config, args, pictures, args.barcode, args.name, cache, options, saved,
+                          journal, records):
                 input("Success! Press any key to exit...")
             else:
                 input("Failed. Press any key to exit...")
 
         elif args.interactive:
+            # The games left unfinished by the previous run come first, their lookup is their journal key
+            resumed = pendingGames(journal, args.dry_run)
             while(True):
-                barcode = input("Please enter barcode (Ctrl+C to stop): ")
-                name = None
-                if not barcode:
-                    name = input("Please enter name (Ctrl+C to stop): ")
-                success = recordGame(driver, handles, config, args, file_iterator, barcode, name)
-                if not success:
-                    print("Could not find a game for provided parameters")
+                barcode = None
+                template = None
+                name = resumed.pop(0) if resumed else None
+                if name:
+                    template = journal.get(gameKey(name, args.dry_run)).get("template")
+                else:
+                    barcode, template = splitTemplate(input("Please enter barcode [@template] (Ctrl+C to stop): "))
+                    if not barcode:
+                        name, template = splitTemplate(input("Please enter name [@template] (Ctrl+C to stop): "))
+                try:
+                    success = recordGame(drivers, templates.get(template), args, pictures, barcode, name, cache,
+                                         options, saved, journal, records)
+                    if not success:
+                        print("Could not find a game for provided parameters")
+                except Exception as e:
+                    # The session goes on, the game is resumed when entered again
+                    print(colored("Error: {}. Its progress is kept, enter the game again to resume it.".format(e),
+                                  "red"))
+
+        elif args.batch:
+            if args.in_flight > 1:
+                runBatchAsync(drivers, templates, args, pictures, picture_pipeline, cache, options, saved, journal,
+                              records)
+            else:
+                runBatch(drivers, templates, args, pictures, picture_pipeline, cache, options, saved, journal,
+                         records)
 
         else:
             raise Exception("Unimplemented mode")
 
     except Exception as e:
-        input("Error: {}".format(e))
+        if args.unattended:
+            print(colored("Error: {}".format(e), "red"))
+        else:
+            input("Error: {}".format(e))
 
     finally:
-        driver.quit()
+        drivers.close()
+        picture_pipeline.close()
+        if records:
+            records.close()
+            print("Scrapped games written to {}".format(args.output))
+        if cache:
+            cache.close()
+        if saved:
+            saved.close()
+        SegaRetro.barcodes.close()
+        if args.profile:
+            profiler.write(args.profile)
+            print(profiler.summary())
+            print("Profile trace written to {}".format(args.profile))
 
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+from profiler import profiler
+
+import asyncio
+import concurrent.futures
+
+
+class OperatorQueue:
+    # The prompts of all the games in flight, asked one at a time on the console in the order they were raised.
+    # Each prompt is tagged with its game, and only the game asking waits for the answer.
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.console = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.task = None
+
+    def start(self):
+        self.task = self.loop.create_task(self._serve())
+
+    async def _serve(self):
+        while True:
+            message, answer = await self.queue.get()
+            try:
+                answer.set_result(await self.loop.run_in_executor(self.console, input, message))
+            except Exception as e:
+                answer.set_exception(e)
+
+    async def ask(self, message, label=None):
+        answer = self.loop.create_future()
+        await self.queue.put(("[{}] {}".format(label, message) if label else message, answer))
+        return await answer
+
+    def askFromThread(self, message):
+        # Blocking prompts of the scrapers and forms, running on the executor threads
+        label = profiler.current().label
+        return asyncio.run_coroutine_threadsafe(self.ask(message, label), self.loop).result()
+
+    def close(self):
+        if self.task:
+            self.task.cancel()
+        self.console.shutdown(wait=False)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+import difflib
+import re
+import threading
+import unicodedata
+
+
+def normalize(label):
+    # Case, accents, punctuation and spacing differences are not significant
+    text = unicodedata.normalize("NFKD", str(label)).encode("ascii", "ignore").decode().casefold()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+class SelectOptions:
+    # The visible labels of a single select, indexed for exact, normalized and word-prefix lookups
+    def __init__(self, labels=()):
+        self.exact = set()
+        self.normalized = {}
+        self.words = {} # first normalized word -> labels
+        for label in labels:
+            self.add(label)
+
+    def add(self, label):
+        key = normalize(label)
+        if not key:
+            return
+        self.exact.add(label)
+        self.normalized.setdefault(key, label)
+        self.words.setdefault(key.split()[0], set()).add(label)
+
+    def resolve(self, value):
+        if value in self.exact:
+            return value
+        key = normalize(value)
+        if not key:
+            return None
+        if key in self.normalized:
+            return self.normalized[key]
+
+        # One is the beginning of the other on a word boundary, e.g. "Sega" and "SEGA Enterprises"
+        candidates = [label for label in self.words.get(key.split()[0], ())
+                      if normalize(label).startswith(key + " ") or key.startswith(normalize(label) + " ")]
+        if len(candidates) == 1:
+            return candidates[0]
+
+        # Spelling variations, only when there is no ambiguity
+        close = difflib.get_close_matches(key, self.normalized.keys(), n=2, cutoff=0.85)
+        if len(close) == 1:
+            return self.normalized[close[0]]
+        return None
+
+
+class OptionIndex:
+    # Snapshots of the admin selects options, keyed by field id and kept for the whole session.
+    # Fields which are not selects are remembered as such, so each field is queried at most once.
+    def __init__(self):
+        self.selects = {}
+        # Paths of the admin forms whose selects were all snapshotted, before filling any of them
+        self.forms = set()
+        self.lock = threading.Lock()
+
+    def known(self, field_id):
+        return field_id in self.selects
+
+    def isSelect(self, field_id):
+        return self.selects.get(field_id) is not None
+
+    def load(self, field_id, labels):
+        with self.lock:
+            self.selects[field_id] = SelectOptions(labels) if labels is not None else None
+
+    def add(self, field_id, label):
+        # Objects created during the session are appended without a new snapshot
+        with self.lock:
+            if self.selects.get(field_id) is not None:
+                self.selects[field_id].add(label)
+
+    def contains(self, field_id, label):
+        options = self.selects.get(field_id)
+        return options is not None and label in options.exact
+
+    def resolve(self, field_id, value):
+        options = self.selects.get(field_id)
+        return options.resolve(value) if options else None
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+import collections
+import concurrent.futures
+import glob
+import os.path
+import shutil
+import tempfile
+
+
+def preparePicture(source, staging_folder, max_size, quality):
+    # Runs in a worker process: validates the picture, then downscales and recompresses it if it is too large.
+    # Returns the path of the file to upload.
+    from PIL import Image
+    with Image.open(source) as image:
+        image.verify()
+
+    with Image.open(source) as image:
+        if not max_size or max(image.size) <= max_size:
+            return source
+        exif = image.info.get("exif", b"")
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        # A folder per picture keeps the uploaded file name, while different folders may use the same names
+        target = os.path.join(tempfile.mkdtemp(dir=staging_folder), os.path.basename(source))
+        # The EXIF data is kept, so is the orientation of the picture
+        image.save(target, "JPEG", quality=quality, optimize=True, exif=exif)
+        return target
+
+
+class PictureQueue:
+    # The pictures of a folder, in name order, consumed by groups of one picture per occurrence picture guide
+    def __init__(self, pipeline, files):
+        self.pipeline = pipeline
+        self.pending = collections.deque((path, pipeline.submit(path)) for path in files)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def nextGroup(self):
+        return self.takeGroup()[1]
+
+    def takeGroup(self, sources=None, size=None):
+        # Returns the source paths of the next group and the paths of their prepared files.
+        # A resumed game gives the sources it already took, to get them prepared again.
+        # Games of another template may have a different number of pictures than the pipeline default.
+        size = size or self.pipeline.group_size
+        if sources:
+            group = [(path, self.pipeline.submit(path)) for path in sources]
+            self.pending = collections.deque(item for item in self.pending if item[0] not in sources)
+        else:
+            if len(self.pending) < size:
+                raise Exception("{} picture(s) left, {} are required for an occurrence".format(len(self.pending),
+                                                                                             size))
+            # The whole group is consumed even if a picture is invalid, so the next game gets its own pictures
+            group = [self.pending.popleft() for index in range(size)]
+        staged = []
+        for path, future in group:
+            try:
+                staged.append(future.result())
+            except Exception as e:
+                raise Exception("Picture {} cannot be used: {}".format(path, e)) from e
+        return [path for path, future in group], staged
+
+
+class PicturePipeline:
+    # Validates and prepares pictures in a process pool, ahead of the occurrence forms that upload them
+    def __init__(self, group_size, max_size=1600, quality=85, workers=None, extension="jpg"):
+        self.group_size = group_size
+        self.max_size = max_size
+        self.quality = quality
+        self.extension = extension
+        self.executor = concurrent.futures.ProcessPoolExecutor(workers)
+        self.staging_folder = tempfile.mkdtemp(prefix="collecster-pictures-")
+        # The queue of each staged folder, shared by all the games which take their pictures from it
+        self.queues = {}
+
+    def submit(self, path):
+        return self.executor.submit(preparePicture, path, self.staging_folder, self.max_size, self.quality)
+
+    def stage(self, folder, exclude=()):
+        # The excluded pictures were already used, by a previous run for example.
+        # A folder is only staged once per run, so two games naming it do not take the same pictures.
+        folder = os.path.abspath(folder)
+        if folder not in self.queues:
+            files = sorted(glob.glob(os.path.join(glob.escape(folder), "*.{}".format(self.extension))))
+            self.queues[folder] = PictureQueue(self, [path for path in files if path not in exclude])
+        return self.queues[folder]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        shutil.rmtree(self.staging_folder, ignore_errors=True)
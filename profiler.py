@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+import collections
+import contextlib
+import csv
+import functools
+import json
+import math
+import os.path
+import threading
+import time
+
+
+def percentile(values, fraction):
+    # Nearest rank, on already sorted values
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Trace:
+    # The timed spans and counters of a single game
+    def __init__(self, label):
+        self.label = label
+        self.spans = [] # (stage, start, duration, thread name)
+        self.counters = collections.Counter()
+
+
+class Profiler:
+    # Records the time spent in each stage of the games, when enabled.
+    # Spans and counters are attributed to the game of the current thread, set by game().
+    # Work handed to other threads keeps its game when the callable is wrapped with bind().
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.traces = collections.OrderedDict()
+        self.local = threading.local()
+
+    def _trace(self, label):
+        with self.lock:
+            if label not in self.traces:
+                self.traces[label] = Trace(label)
+            return self.traces[label]
+
+    def current(self):
+        return getattr(self.local, "trace", None) or self._trace(None)
+
+    @contextlib.contextmanager
+    def game(self, label):
+        previous = getattr(self.local, "trace", None)
+        self.local.trace = self._trace(str(label))
+        try:
+            yield self.local.trace
+        finally:
+            self.local.trace = previous
+
+    def bind(self, function):
+        trace = getattr(self.local, "trace", None)
+
+        @functools.wraps(function)
+        def bound(*args, **kwargs):
+            previous = getattr(self.local, "trace", None)
+            self.local.trace = trace
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.local.trace = previous
+        return bound
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            trace = self.current()
+            with self.lock:
+                trace.spans.append((stage, start - self.origin, duration, threading.current_thread().name))
+
+    def count(self, counter, increment=1):
+        if self.enabled:
+            trace = self.current()
+            with self.lock:
+                trace.counters[counter] += increment
+
+    def write(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock, open(path, "w", newline="") as output:
+            if path.endswith(".csv"):
+                # Counters are written as rows without duration
+                rows = csv.writer(output)
+                rows.writerow(["game", "stage", "start", "duration", "thread"])
+                for trace in self.traces.values():
+                    for stage, start, duration, thread in trace.spans:
+                        rows.writerow([trace.label, stage, "{:.4f}".format(start), "{:.4f}".format(duration), thread])
+                    for counter, value in sorted(trace.counters.items()):
+                        rows.writerow([trace.label, counter, "", value, ""])
+            else:
+                json.dump([{
+                        "game": trace.label,
+                        "spans": [{"stage": stage, "start": round(start, 4), "duration": round(duration, 4),
+                                   "thread": thread}
+                                  for stage, start, duration, thread in trace.spans],
+                        "counters": dict(trace.counters),
+                    } for trace in self.traces.values()], output, indent=2)
+
+    def summary(self):
+        durations = collections.defaultdict(list)
+        counters = collections.Counter()
+        with self.lock:
+            for trace in self.traces.values():
+                for stage, start, duration, thread in trace.spans:
+                    durations[stage].append(duration)
+                counters.update(trace.counters)
+
+        lines = ["{:<32} {:>6} {:>9} {:>8} {:>8} {:>8}".format("stage", "count", "total", "p50", "p95", "max")]
+        for stage, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+            values.sort()
+            lines.append("{:<32} {:>6} {:>9.2f} {:>8.2f} {:>8.2f} {:>8.2f}".format(
+                stage, len(values), sum(values), percentile(values, 0.5), percentile(values, 0.95), values[-1]))
+        for counter, value in sorted(counters.items()):
+            lines.append("{:<32} {:>6}".format(counter, value))
+        return "\n".join(lines)
+
+
+# Shared by the whole program, it only records once enabled
+profiler = Profiler()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+import json
+import os.path
+import threading
+
+
+class RecordsFile:
+    # The games scrapped by a dry run, one JSON object per line, written as soon as each game is scrapped.
+    # Records are appended, so a resumed dry run completes the file of the interrupted one.
+    # The file is a manifest: its rows carry their "store", which is submitted without scraping again.
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # Opened by the first record, a run which has none leaves no empty file
+        self.file = None
+
+    def write(self, row, config, store):
+        # The manifest columns of the game are kept along with its template and scrapped values
+        record = {key: value for key, value in row.items() if value not in (None, "") and key != "store"}
+        record["template"] = config.name
+        record["store"] = store.toDict()
+        with self.lock:
+            if self.file is None:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.file = open(self.path, "a")
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+from optionindex import normalize
+
+import os.path
+import sqlite3
+import threading
+import time
+
+
+class SavedIndex:
+    # The concepts and releases already saved in Collecster, kept between runs so further copies
+    # of a game only add an occurrence.
+    # They are found by barcode, normalized name or SegaRetro URL. Releases are also told apart by
+    # their system specification and region, except by barcode which identifies a single release.
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS saved ("
+                                    "model TEXT, key TEXT, saved_name TEXT, stored REAL, PRIMARY KEY (model, key))")
+
+    def _keys(self, barcode, names, urls, specification, region):
+        keys = []
+        if barcode:
+            keys.append("barcode:{}".format(barcode))
+        release = "{}|{}".format(specification or "", region or "")
+        keys.extend("url:{}|{}".format(url, release) for url in urls)
+        keys.extend("name:{}|{}".format(normalize(name), release) for name in names if normalize(name))
+        return keys
+
+    def find(self, model, barcode=None, names=(), urls=(), specification=None, region=None):
+        with self.lock:
+            for key in self._keys(barcode, names, urls, specification, region):
+                row = self.connection.execute("SELECT saved_name FROM saved WHERE model = ? AND key = ?",
+                                              (model, key)).fetchone()
+                if row:
+                    return row[0]
+        return None
+
+    def record(self, model, saved_name, barcode=None, names=(), urls=(), specification=None, region=None):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO saved VALUES (?, ?, ?, ?)",
+                                        [(model, key, saved_name, now)
+                                         for key in self._keys(barcode, names, urls, specification, region)])
+
+    def close(self):
+        self.connection.close()
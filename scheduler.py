@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+import random
+import threading
+import time
+import urllib.parse
+
+
+class TransientError(Exception):
+    # A failure worth retrying later: throttling, server errors, network errors or timeouts.
+    # The server may tell how many seconds to wait with retry_after.
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    # Allows rate requests per second on average, and bursts of up to burst requests
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    # Opens after threshold consecutive failures: calls then fail at once for cooldown seconds,
+    # after which a single trial call decides whether it closes again
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened is None:
+                return True
+            if not self.trial and time.monotonic() - self.opened >= self.cooldown:
+                self.trial = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened = time.monotonic()
+            self.trial = False
+
+
+class Scheduler:
+    # Sends the requests to each host at the rate it allows, and retries the transient failures
+    # with an exponential backoff and jitter. A host failing repeatedly is not requested for a while.
+
+    def __init__(self, default_rate=None, rates=None, burst=2, retries=0, base_delay=1, max_delay=60,
+                 failure_threshold=5, cooldown=120):
+        self.default_rate = default_rate
+        self.rates = dict(rates or {})
+        self.burst = burst
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.breakers = {}
+
+    def _host(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                rate = self.rates.get(host, self.default_rate)
+                self.buckets[host] = TokenBucket(rate, self.burst) if rate else None
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return self.buckets[host], self.breakers[host]
+
+    def delay(self, attempt, retry_after=None):
+        # Full jitter: concurrent clients retrying the same host do not all come back at once
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, url, function, *args):
+        host = urllib.parse.urlsplit(url).netloc
+        bucket, breaker = self._host(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError("Requests to {} are suspended after repeated failures".format(host))
+            if bucket:
+                bucket.acquire()
+            try:
+                result = function(*args)
+            except TransientError as e:
+                breaker.failure()
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self.delay(attempt, e.retry_after))
+                attempt += 1
+            else:
+                breaker.success()
+                return result
+
+
+# Shared by all the drivers, so the limits hold for the whole program
+scheduler = Scheduler()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+import json
+import os.path
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+
+class ScrapCache:
+    # On-disk cache of the scrapped websites, shared by every run.
+    # Raw pages are keyed by their URL, extracted fields by source and lookup value.
+    # Entries older than ttl seconds are ignored, and the least recently used ones are evicted
+    # once the cache grows over max_size bytes.
+
+    def __init__(self, path, ttl=None, max_size=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = {"pages": [0, 0], "fields": [0, 0]} # [hits, misses]
+        # Scrapers run on several threads, sqlite connections are not meant to be shared without a lock
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS pages ("
+                                    "source TEXT, lookup TEXT, url TEXT, content BLOB,"
+                                    "stored REAL, accessed REAL, size INTEGER, PRIMARY KEY (source, lookup))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS fields ("
+                                    "source TEXT, lookup TEXT, content TEXT,"
+                                    "stored REAL, accessed REAL, size INTEGER, PRIMARY KEY (source, lookup))")
+
+    def _get(self, table, source, lookup, columns):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT {}, stored FROM {} WHERE source = ? AND lookup = ?".format(columns, table),
+                (source, lookup)).fetchone()
+            if row and self.ttl and row[-1] < time.time() - self.ttl:
+                row = None
+            self.stats[table][0 if row else 1] += 1
+            if row:
+                with self.connection:
+                    self.connection.execute("UPDATE {} SET accessed = ? WHERE source = ? AND lookup = ?".format(table),
+                                            (time.time(), source, lookup))
+            return row[:-1] if row else None
+
+    def _put(self, table, values):
+        now = time.time()
+        with self.lock, self.connection:
+            size = sum(len(value) for value in values[2:] if value)
+            placeholders = ", ".join("?" * (len(values) + 3))
+            self.connection.execute("INSERT OR REPLACE INTO {} VALUES ({})".format(table, placeholders),
+                                    values + (now, now, size))
+            self._evict()
+
+    def _evict(self):
+        if self.ttl:
+            for table in ("pages", "fields"):
+                self.connection.execute("DELETE FROM {} WHERE stored < ?".format(table), (time.time() - self.ttl,))
+        if self.max_size:
+            total = sum(self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM {}".format(table)).fetchone()[0]
+                        for table in ("pages", "fields"))
+            # Raw pages are by far the largest entries, and can be fetched again cheaply compared to
+            # the extracted fields, which may contain manual corrections
+            for table in ("pages", "fields"):
+                rows = self.connection.execute("SELECT source, lookup, size FROM {} ORDER BY accessed".format(table))
+                for source, lookup, size in rows.fetchall():
+                    if total <= self.max_size:
+                        return
+                    self.connection.execute("DELETE FROM {} WHERE source = ? AND lookup = ?".format(table),
+                                            (source, lookup))
+                    total -= size
+
+    def getPage(self, url):
+        row = self._get("pages", urllib.parse.urlsplit(url).netloc, url, "url, content")
+        return (row[0], row[1]) if row else None
+
+    def putPage(self, url, final_url, content):
+        self._put("pages", (urllib.parse.urlsplit(url).netloc, url, final_url, content))
+
+    def getFields(self, source, lookup):
+        row = self._get("fields", source, str(lookup), "content")
+        return json.loads(row[0]) if row else None
+
+    def putFields(self, source, lookup, fields):
+        self._put("fields", (source, str(lookup), json.dumps(fields)))
+
+    def report(self):
+        return "Cache: " + ", ".join("{} {} hit(s) / {} miss(es)".format(table, hits, misses)
+                                     for table, (hits, misses) in sorted(self.stats.items()))
+
+    def close(self):
+        self.connection.close()
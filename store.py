@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# The scrapped values of a game, without any dependency on the browser or HTTP backends
+
+
+def insideOutmostQuotes(text):
+    result = text[text.index('"')+1:]
+    result = result[:result.rfind('"')]
+    return result
+
+
+class Concept:
+    def __init__(self):
+        self.urls = []
+        self.developer = None
+    pass
+
+class Release:
+    def __init__(self):
+        self.publisher = None
+        self.barcode = None
+
+class Store:
+    def __init__(self):
+        self.concept = Concept()
+        self.release = Release()
+
+    def __str__(self):
+        lines = []  
+        for key, value in self.__dict__.items():
+            lines.append("{}: {}".format(key, value.__dict__))
+        return "\n".join(lines)
+
+    def toDict(self):
+        dictionary = {}
+        for key, value in self.__dict__.items():
+            dictionary[key] = {name: (field.toDict() if isinstance(field, Date) else field)
+                               for name, field in value.__dict__.items()}
+        return dictionary
+
+    @classmethod
+    def fromDict(cls, dictionary):
+        store = cls()
+        for key, fields in dictionary.items():
+            for name, field in fields.items():
+                if name == "date" and field:
+                    field = Date.fromDict(field)
+                setattr(getattr(store, key), name, field)
+        return store
+
+
+class Date:
+    def __init__(self, value):
+        blocks = value.split("-")
+        if len(blocks) == 3:
+            self.partial_date = value
+            self.precision = "Day"
+        elif len(blocks) == 2:
+            self.partial_date = "{}-01".format(value)
+            self.precision = "Month"
+        elif len(blocks) == 1:
+            self.partial_date = "{}-01-01".format(value)
+            self.precision = "Year"
+
+    def __repr__(self):
+        return "{}({})".format(self.partial_date, self.precision)
+
+    def toDict(self):
+        return {"partial_date": self.partial_date, "precision": self.precision}
+
+    @classmethod
+    def fromDict(cls, dictionary):
+        date = cls.__new__(cls)
+        date.partial_date = dictionary["partial_date"]
+        date.precision = dictionary["precision"]
+        return date
+
+    def formFields(self):
+        return {"partial_date": self.partial_date, "partial_date_precision": self.precision}
+
+    def fill(self, webpage):
+        webpage.fillForm(self.formFields())
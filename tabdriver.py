@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# Selenium is only imported once a tab is used, importing the module is cheap
+
+import threading
+import time
+
+
+# Interval at which a tab checks whether its page is loaded, other tabs run their commands in between
+LOAD_POLL_INTERVAL = 0.1
+
+
+class BrowserTabs:
+    # The windows of a single Chrome, each handed out as a TabDriver to the game step which uses it.
+    # A WebDriver session only has one current window, so every command switches to the window of its tab,
+    # one command at a time. Commands are short: page loads do not block the session (the browser is started
+    # with the 'none' page load strategy), a tab waiting on its page or on a condition lets the others run.
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.lock = threading.Lock()
+        self.current = driver.current_window_handle
+        # The windows already open (the first one, or the ones left by a previous run) are used first
+        self.free = list(driver.window_handles)
+        self.tabs = []
+
+    def open(self, role):
+        with self.lock:
+            handle = self.free.pop(0) if self.free else None
+            if handle is None:
+                before = set(self.driver.window_handles)
+                self.driver.execute_script("window.open('about:blank', '_blank');")
+                handle = (set(self.driver.window_handles) - before).pop()
+            tab = TabDriver(self, handle, role)
+            self.tabs.append(tab)
+        return tab
+
+    def run(self, handle, command, *args, **kwargs):
+        with self.lock:
+            if self.current != handle:
+                self.driver.switch_to_window(handle)
+                self.current = handle
+            return command(*args, **kwargs)
+
+
+def unwrap(value):
+    if isinstance(value, TabElement):
+        return value.element
+    if isinstance(value, (list, tuple)):
+        return type(value)(unwrap(item) for item in value)
+    return value
+
+
+class TabCommands:
+    # Attributes are read, and methods called, on the window of the tab
+
+    def _target(self):
+        raise NotImplementedError
+
+    def _wrap(self, value):
+        from selenium.webdriver.remote.webelement import WebElement
+        if isinstance(value, WebElement):
+            return TabElement(self.tab, value)
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        return value
+
+    def __getattr__(self, name):
+        value = self.tab.browser.run(self.tab.handle, getattr, self._target(), name)
+        if not callable(value):
+            return self._wrap(value)
+
+        def command(*args, **kwargs):
+            args = unwrap(args)
+            kwargs = {key: unwrap(argument) for key, argument in kwargs.items()}
+            return self._wrap(self.tab.browser.run(self.tab.handle, value, *args, **kwargs))
+        return command
+
+
+class TabElement(TabCommands):
+    # An element only exists in the window it was found in
+
+    def __init__(self, tab, element):
+        self.tab = tab
+        self.element = element
+
+    def _target(self):
+        return self.element
+
+    def __eq__(self, other):
+        return self.element == unwrap(other)
+
+    def __hash__(self):
+        return hash(self.element)
+
+
+class TabDriver(TabCommands):
+    # A WebDriver of its own for the scrapers and forms, which drives one window of the shared browser
+
+    def __init__(self, browser, handle, role=None):
+        self.browser = browser
+        self.handle = handle
+        self.role = role
+        self.page_load_timeout = 30
+
+    @property
+    def tab(self):
+        return self
+
+    def _target(self):
+        return self.browser.driver
+
+    def set_page_load_timeout(self, timeout):
+        self.page_load_timeout = timeout
+
+    def loaded(self):
+        from selenium.common.exceptions import WebDriverException
+        try:
+            return self.browser.run(self.handle, self.browser.driver.execute_script,
+                                    "return !window.collecsterLeaving && document.readyState == 'complete';")
+        except WebDriverException:
+            # The document being left cannot run scripts anymore, the next one is not there yet
+            return False
+
+    def get(self, url):
+        from selenium.common.exceptions import TimeoutException
+        # The page being left is marked, so its ready state is not mistaken for the one of the loaded page
+        self.browser.run(self.handle, self.browser.driver.execute_script, "window.collecsterLeaving = true;")
+        self.browser.run(self.handle, self.browser.driver.get, url)
+        deadline = time.time() + self.page_load_timeout
+        while not self.loaded():
+            if time.time() > deadline:
+                raise TimeoutException("Timed out loading {}".format(url))
+            time.sleep(LOAD_POLL_INTERVAL)
+
+    def quit(self):
+        # The window is left open for the next tab, the browser is quit by its owner
+        with self.browser.lock:
+            self.browser.tabs.remove(self)
+            self.browser.free.append(self.handle)
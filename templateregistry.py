@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+import glob
+import json
+import os.path
+
+
+TEMPLATES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+DEFAULT_TEMPLATE = "master-system-eu"
+
+# The settings a template must define, by section, with the type of their value
+REQUIRED_SETTINGS = {
+    "concept": {"nature": str},
+    "release": {"release_region": str, "system_specification": str, "attributes": list},
+    "occurrence": {"origin": str, "working_condition": str, "pictures": list},
+    "scrappers": {"segaretro": dict, "wikipedia": dict, "giantbomb": dict},
+}
+REQUIRED_SCRAPPER_SETTINGS = {
+    "segaretro": {"date-system-title": str, "date-region": str},
+    "wikipedia": {"title-systems": list},
+    "giantbomb": {"system-abbreviation": str},
+}
+
+
+def loadTemplateFile(path):
+    with open(path) as template:
+        if path.endswith((".yaml", ".yml")):
+            # YAML templates are optional, as is their dependency
+            try:
+                import yaml
+            except ImportError:
+                raise Exception("Template {} is in YAML, which requires PyYAML to be installed".format(path))
+            return yaml.safe_load(template)
+        return json.load(template)
+
+
+def validateTemplate(name, data):
+    errors = []
+
+    def check(section, settings, values):
+        if not isinstance(values, dict):
+            errors.append("'{}' must be a mapping".format(section))
+            return
+        for key, kind in settings.items():
+            if key not in values:
+                errors.append("'{}' is missing '{}'".format(section, key))
+            elif not isinstance(values[key], kind):
+                errors.append("'{}.{}' must be a {}".format(section, key, kind.__name__))
+
+    check("template", {section: dict for section in REQUIRED_SETTINGS}, data)
+    for section, settings in REQUIRED_SETTINGS.items():
+        check(section, settings, data.get(section, {}))
+    for scrapper, settings in REQUIRED_SCRAPPER_SETTINGS.items():
+        check("scrappers.{}".format(scrapper), settings, data.get("scrappers", {}).get(scrapper, {}))
+    pictures = data.get("occurrence", {}).get("pictures", [])
+    if not pictures or not all(isinstance(guide, dict) and guide for guide in pictures):
+        errors.append("'occurrence.pictures' must list at least one picture guide, each a mapping of fields")
+    if errors:
+        raise Exception("Invalid template {}: {}".format(name, "; ".join(errors)))
+
+
+class TemplateConfig:
+    # The values a game is recorded with: the nature, system and attributes of its release, how its occurrence
+    # pictures are described, and what the scrapers look for. Loaded from a file of the templates folder.
+
+    def __init__(self, name=DEFAULT_TEMPLATE, data=None):
+        if data is None:
+            data = loadTemplateFile(os.path.join(TEMPLATES_FOLDER, "{}.json".format(name)))
+        validateTemplate(name, data)
+        self.name = name
+        self.concept = data["concept"]
+        self.release = data["release"]
+        self.occurrence = data["occurrence"]
+        self.scrappers = data["scrappers"]
+
+        # Computed once, the forms and scrapers of each game use them as is
+        self.picture_fields = {}
+        for index, picture_guide in enumerate(self.occurrence["pictures"]):
+            for field, value in picture_guide.items():
+                self.picture_fields[field.format(index=index)] = value
+        self.giantbomb_platform_xpath = "//span[@class=\"search-platform\"][contains(text(), \"{}\")]".format(
+                                            self.scrappers["giantbomb"]["system-abbreviation"])
+
+
+class TemplateRegistry:
+    # All the templates of a folder, parsed and validated once at startup.
+    # A template is named after its file, without extension.
+
+    def __init__(self, folder=TEMPLATES_FOLDER, default=DEFAULT_TEMPLATE):
+        self.templates = {}
+        for path in sorted(glob.glob(os.path.join(glob.escape(folder), "*"))):
+            name, extension = os.path.splitext(os.path.basename(path))
+            if extension in (".json", ".yaml", ".yml"):
+                self.templates[name] = TemplateConfig(name, loadTemplateFile(path))
+        self.default = default
+        self.get(default)
+
+    def get(self, name=None):
+        name = name or self.default
+        if name not in self.templates:
+            raise Exception("Unknown template '{}', available: {}".format(name, ", ".join(sorted(self.templates))))
+        return self.templates[name]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+from main import Collecster, AdminSession, DriverPool, TemplateRegistry, OptionIndex, runBatch, runBatchAsync
+from fixtureserver import CollecsterServer
+from pictures import PicturePipeline
+from journal import Journal
+
+from PIL import Image
+
+import argparse
+import csv
+import json
+import os.path
+import tempfile
+
+
+GAME = {
+    "concept": {"name": "Spy vs Spy", "developer": "First Star Software",
+                "urls": ["https://segaretro.org/Spy_vs_Spy"]},
+    "release": {"barcode": "5060000000016", "publisher": "Sega",
+                "date": {"partial_date": "1987-09-01", "precision": "Month"}},
+}
+
+
+def withValues(game, **values):
+    # A copy of the game with other concept and release values
+    game = json.loads(json.dumps(game))
+    for key, value in values.items():
+        model, field = key.split("_", 1)
+        game[model][field] = value
+    return game
+
+
+def readResults(manifest):
+    with open("{}.results.csv".format(os.path.splitext(manifest)[0]), newline="") as results:
+        return list(csv.DictReader(results))
+
+
+def writeManifest(path, rows):
+    with open(path, "w") as manifest:
+        for row in rows:
+            manifest.write(json.dumps(row) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test program, recording batches of games to a local stand-in.")
+    args = parser.parse_args()
+    args.unattended = True
+    args.skip_wikipedia = False
+    args.verbose = False
+    args.timeout = 10
+    args.operator_timeout = 10
+    args.concept = None
+    args.release = None
+    args.batch_results = None
+    args.review = None
+    args.from_records = None
+    args.site_concurrency = 2
+
+    for in_flight in (1, 3):
+        with CollecsterServer(("collector", "secret")) as server, tempfile.TemporaryDirectory() as folder:
+            Collecster.domain = server.origin + "/admin/advideogame/"
+            credentials_file = os.path.join(folder, "credentials.json")
+            json.dump({"username": "collector", "password": "secret"}, open(credentials_file, "w"))
+
+            args.picturefolder = os.path.join(folder, "pictures")
+            os.makedirs(os.path.join(args.picturefolder, "b"))
+            for index in range(16):
+                Image.new("RGB", (64, 48)).save(os.path.join(args.picturefolder, "b", "b{:02}.jpg".format(index)))
+            args.in_flight = in_flight
+            run = runBatchAsync if in_flight > 1 else runBatch
+
+            templates = TemplateRegistry()
+            drivers = DriverPool(lambda role: AdminSession(args.timeout))
+            Collecster(templates.get()).login(drivers["collecster"], credentials_file)
+            pipeline = PicturePipeline(4)
+            journal = Journal(os.path.join(folder, "journal.json"))
+
+            # Rows naming the same pictures subfolder take their own pictures from it
+            args.batch = os.path.join(folder, "pictures.jsonl")
+            writeManifest(args.batch, [{"store": GAME, "pictures": "b"}, {"store": GAME, "pictures": "b"}])
+            run(drivers, templates, args, None, pipeline, None, OptionIndex(), None, journal)
+            assert(sorted(upload[2] for upload in server.model.uploads) == ["b{:02}.jpg".format(index)
+                                                                           for index in range(8)])
+            assert(len(server.model.choices["occurrences"]) == 2)
+
+            # Records are read as JSON lines whatever the extension of their file
+            args.batch = args.from_records = os.path.join(folder, "records.json")
+            writeManifest(args.batch, [{"store": GAME, "pictures": "b"}])
+            run(drivers, templates, args, None, pipeline, None, OptionIndex(), None, journal)
+            assert(len(server.model.choices["occurrences"]) == 3)
+            args.from_records = None
+
+            # A row interrupted after its concept was saved is resumed with the release
+            args.batch = os.path.join(folder, "resume.jsonl")
+            writeManifest(args.batch, [{"store": withValues(GAME, concept_name="Alex Kidd"), "pictures": "b"}])
+            prefillRelease = Collecster.prefillRelease
+
+            def interrupted(collecster, driver, store):
+                raise Exception("Interrupted")
+
+            Collecster.prefillRelease = interrupted
+            run(drivers, templates, args, None, pipeline, None, OptionIndex(), None, journal)
+            Collecster.prefillRelease = prefillRelease
+            assert(readResults(args.batch)[0]["status"] == "failed")
+            assert(server.model.choices["concepts"].count("Alex Kidd") == 1)
+            releases = len(server.model.choices["releases"])
+            run(drivers, templates, args, None, pipeline, None, OptionIndex(), None, journal)
+            assert(readResults(args.batch)[0]["status"] == "saved")
+            assert(server.model.choices["concepts"].count("Alex Kidd") == 1)
+            assert(len(server.model.choices["releases"]) == releases + 1)
+            assert(len(server.model.choices["occurrences"]) == 4)
+            assert(sorted(upload[2] for upload in server.model.uploads)[-4:] == ["b{:02}.jpg".format(index)
+                                                                                for index in range(12, 16)])
+
+            # A row sent to review is submitted from the review file, not again from the manifest
+            args.batch = os.path.join(folder, "review.jsonl")
+            unknown = withValues(GAME, release_publisher="Totally Unknown Co")
+            writeManifest(args.batch, [{"store": unknown, "pictures": "b"}])
+            for attempt in range(2):
+                run(drivers, templates, args, None, pipeline, None, OptionIndex(), None, journal)
+            assert(readResults(args.batch)[0]["status"].startswith("sent to review"))
+            with open(os.path.join(folder, "review.review.jsonl")) as review:
+                assert(len(review.readlines()) == 1)
+            assert(len(server.model.choices["occurrences"]) == 4)
+
+            pipeline.close()
+            drivers.close()
+
+    print("Success !")
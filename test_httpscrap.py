@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+from main import Store, TemplateConfig, SegaRetro, Wikipedia, GiantBomb, scrapSources, scrapWikipedia
+from httpdriver import HttpDriver
+from fixtureserver import FixtureServer
+from scrapcache import ScrapCache
+from wikititles import WikipediaTitles, TitleIndex
+from barcodeindex import BarcodeIndex
+
+import argparse
+import os.path
+import tempfile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test program, scraping the saved fixtures through the HTTP backend.")
+    args = parser.parse_args()
+    args.skip_wikipedia = False
+    args.unattended = True
+
+    with FixtureServer() as server:
+        SegaRetro.origin = server.origin + "/segaretro"
+        Wikipedia.search_url = server.origin + "/google/search"
+        GiantBomb.origin = server.origin + "/giantbomb"
+
+        drivers = {role: HttpDriver() for role in ("segaretro", "wikipedia", "giantbomb")}
+        config = TemplateConfig()
+
+        assert(not SegaRetro(config).lookup(drivers["segaretro"], "0000000000000"))
+
+        store = Store()
+        store.release.barcode = 5060000000016
+        assert(scrapSources(drivers, config, args, store, store.release.barcode))
+        print(store)
+
+        assert(store.concept.name == "Spy vs Spy")
+        assert(repr(store.release.date) == "1987-09-01(Month)")
+        assert(store.concept.developer == "First Star Software")
+        assert(store.release.publisher == "First Star Software\nSega")
+        assert(store.concept.urls == [
+            server.origin + "/wikipedia/wiki/Spy_vs._Spy_(1984_video_game)",
+            server.origin + "/segaretro/Spy_vs_Spy",
+            server.origin + "/giantbomb/spy-vs-spy/3030-15637/",
+        ])
+
+        # A warm run is entirely answered by the cache
+        with tempfile.TemporaryDirectory() as folder:
+            cache = ScrapCache(os.path.join(folder, "cache.sqlite"))
+            for run in range(2):
+                cached = Store()
+                cached.release.barcode = store.release.barcode
+                assert(scrapSources(drivers, config, args, cached, cached.release.barcode, cache))
+                assert(cached.toDict() == store.toDict())
+            print(cache.report())
+            assert(cache.stats["fields"] == [3, 3])
+            # Missing articles are looked up again
+            uncached = HttpDriver(cache=cache)
+            assert(not SegaRetro(config).lookup(uncached, "0000000000000"))
+            assert(not cache.getPage(uncached.current_url))
+            cache.close()
+
+        # The article is opened directly, its title resolved from an index of the titles dump
+        with tempfile.TemporaryDirectory() as folder:
+            dump = os.path.join(folder, "titles")
+            with open(dump, "w") as titles:
+                titles.write("page_title\nSpy_vs._Spy\nSpy_vs._Spy_(1984_video_game)\nSpy_vs._Spy_II\n")
+            index = TitleIndex.build(dump, os.path.join(folder, "titles.sqlite"))
+            WikipediaTitles.article_url = server.origin + "/wikipedia/wiki/"
+            Wikipedia.titles = WikipediaTitles(index)
+            search_url, Wikipedia.search_url = Wikipedia.search_url, server.origin + "/unreachable"
+            direct = scrapWikipedia(drivers["wikipedia"], config, "Spy vs Spy", False)
+            assert(direct.concept.urls == [server.origin + "/wikipedia/wiki/Spy_vs._Spy_(1984_video_game)"])
+            assert(direct.concept.developer == "First Star Software")
+            Wikipedia.titles = None
+            Wikipedia.search_url = search_url
+            index.close()
+
+        # Barcodes are indexed by the successful lookups, unknown ones fail without loading a page the next time
+        with tempfile.TemporaryDirectory() as folder:
+            SegaRetro.barcodes = BarcodeIndex(os.path.join(folder, "barcodes.sqlite"))
+            indexed = Store()
+            indexed.release.barcode = store.release.barcode
+            assert(scrapSources(drivers, config, args, indexed, indexed.release.barcode))
+            assert(indexed.toDict() == store.toDict())
+            assert(SegaRetro.barcodes.find("506000000001") == "Spy vs Spy")
+            assert(not SegaRetro(config).lookup(drivers["segaretro"], "0000000000000", "0000000000000"))
+            assert(SegaRetro.barcodes.isMissing("0000000000000"))
+            origin, SegaRetro.origin = SegaRetro.origin, server.origin + "/unreachable"
+            assert(not SegaRetro(config).lookup(drivers["segaretro"], "0000000000000", "0000000000000"))
+            SegaRetro.origin = origin
+            # An imported title is not forgotten when it is not found
+            SegaRetro.barcodes.record("4000000000006", "No Such Game")
+            assert(not SegaRetro(config).lookup(drivers["segaretro"], "4000000000006", "4000000000006"))
+            assert(SegaRetro.barcodes.find("4000000000006") == "No Such Game")
+            SegaRetro.barcodes.close()
+            SegaRetro.barcodes = None
+
+        for driver in drivers.values():
+            driver.quit()
+
+        print("Success !")
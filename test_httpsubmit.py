@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+from main import Date, Store, Collecster, TemplateConfig, AdminSession, submitGame
+from templateregistry import loadTemplateFile, TEMPLATES_FOLDER, DEFAULT_TEMPLATE
+from validation import ValidationError
+from fixtureserver import CollecsterServer
+from optionindex import OptionIndex
+from pictures import PicturePipeline
+from savedindex import SavedIndex
+
+from PIL import Image
+
+import argparse
+import json
+import os.path
+import tempfile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test program, posting Collecster forms to a local stand-in.")
+    args = parser.parse_args()
+    args.unattended = True
+    args.timeout = 10
+    args.operator_timeout = 10
+
+    with CollecsterServer(("collector", "secret")) as server, tempfile.TemporaryDirectory() as folder:
+        Collecster.domain = server.origin + "/admin/advideogame/"
+
+        credentials_file = os.path.join(folder, "credentials.json")
+        json.dump({"username": "collector", "password": "secret"}, open(credentials_file, "w"))
+        picture_folder = os.path.join(folder, "pictures")
+        os.mkdir(picture_folder)
+        for index in range(8):
+            # The first picture is over the size limit
+            size = (2400, 1800) if index == 0 else (64, 48)
+            Image.new("RGB", size, (index * 60, 0, 0)).save(os.path.join(picture_folder, "{}.jpg".format(index)))
+
+        session = AdminSession()
+        config = TemplateConfig()
+        Collecster(config).login(session, credentials_file)
+
+        store = Store()
+        store.concept.name = "Spy vs Spy"
+        store.concept.urls = ["http://en.wikipedia.org/wiki/Spy_vs._Spy", "https://segaretro.org/Spy_vs_Spy"]
+        store.concept.developer = "First Star software"
+        store.release.barcode = 5060000000016
+        # Near-misses are resolved by the option index
+        store.release.publisher = "SEGA Enterprises"
+        store.release.date = Date("1987-09")
+
+        pipeline = PicturePipeline(len(config.occurrence["pictures"]), max_size=800)
+        pictures = pipeline.stage(picture_folder)
+        saved = SavedIndex(os.path.join(folder, "saved.sqlite"))
+
+        # The publisher select is only rendered once the concept is chosen, it is checked against the developers
+        unknown = Store.fromDict(store.toDict())
+        unknown.release.publisher = "Totally Unknown Co"
+        try:
+            submitGame(session, config, args, unknown, pictures, options=OptionIndex(), saved=saved)
+            assert(False)
+        except ValidationError as e:
+            assert(e.problems == ["software-0-publisher: 'Totally Unknown Co' is not a Collecster option"])
+        assert(server.model.choices["concepts"] == [])
+
+        submitGame(session, config, args, store, pictures, options=OptionIndex(), saved=saved)
+
+        assert(store.concept.saved_name == "Spy vs Spy")
+        assert(store.release.saved_name == "Spy vs Spy [Master System cartridge game [NTSC-U, PAL]]")
+        assert(server.model.choices["occurrences"] == ["Spy vs Spy [Master System cartridge game [NTSC-U, PAL]] #1"])
+        assert([upload[2] for upload in server.model.uploads] == ["0.jpg", "1.jpg", "2.jpg", "3.jpg"])
+        # The large picture is uploaded downscaled, the others untouched
+        assert(server.model.uploads[0][3] < os.path.getsize(os.path.join(picture_folder, "0.jpg")))
+        assert(server.model.uploads[1][3] == os.path.getsize(os.path.join(picture_folder, "1.jpg")))
+
+        # Another copy, only known by its barcode, is added to the saved release
+        copy = Store()
+        copy.release.barcode = 5060000000016
+        submitGame(session, config, args, copy, pictures, options=OptionIndex(), saved=saved)
+        assert(copy.release.saved_name == store.release.saved_name)
+        assert(server.model.choices["concepts"] == ["Spy vs Spy"])
+        assert(server.model.choices["occurrences"][1] == "Spy vs Spy [Master System cartridge game [NTSC-U, PAL]] #2")
+
+        # The working condition select is snapshotted with a saved release picked
+        data = loadTemplateFile(os.path.join(TEMPLATES_FOLDER, "{}.json".format(DEFAULT_TEMPLATE)))
+        data["occurrence"]["working_condition"] = "Mostly"
+        try:
+            submitGame(session, TemplateConfig(data=data), args, Store.fromDict(copy.toDict()), pictures,
+                       options=OptionIndex(), saved=saved)
+            assert(False)
+        except ValidationError as e:
+            assert("operationalocc-0-working_condition: 'Mostly' is not a Collecster option" in e.problems)
+        assert(len(server.model.choices["occurrences"]) == 2)
+        pipeline.close()
+        saved.close()
+
+        session.quit()
+        print("Success !")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+from scheduler import Scheduler, CircuitBreaker, CircuitOpenError, TransientError
+
+import argparse
+import time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test program, retrying and suspending requests to failing hosts.")
+    args = parser.parse_args()
+
+    # The backoff grows exponentially up to its maximum, with a random part
+    scheduler = Scheduler(base_delay=1, max_delay=10)
+    for attempt in range(6):
+        delays = [scheduler.delay(attempt) for draw in range(200)]
+        assert(all(0 <= delay <= min(10, 2 ** attempt) for delay in delays))
+        assert(len(set(delays)) > 1)
+    # The delay asked by the server is honoured, within the maximum
+    assert(scheduler.delay(0, retry_after=7) == 7)
+    assert(scheduler.delay(0, retry_after=120) == 10)
+
+    # Transient failures are retried, the others are not
+    scheduler = Scheduler(retries=2, base_delay=0.01)
+    calls = []
+
+    def flaky(failures):
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise TransientError("HTTP 503", retry_after=0.05 if len(calls) == 1 else None)
+        return "page"
+
+    assert(scheduler.call("http://flaky.example/a", flaky, 2) == "page")
+    assert(len(calls) == 3)
+    assert(calls[1] - calls[0] >= 0.05)
+    calls.clear()
+    try:
+        scheduler.call("http://flaky.example/b", flaky, 5)
+        assert(False)
+    except TransientError:
+        assert(len(calls) == 3)
+
+    # The breaker opens after consecutive failures, a single trial call is let through after the cooldown
+    breaker = CircuitBreaker(threshold=2, cooldown=0.1)
+    breaker.failure()
+    assert(breaker.allow())
+    breaker.failure()
+    assert(not breaker.allow())
+    time.sleep(0.1)
+    assert(breaker.allow())
+    assert(not breaker.allow())
+    # A failed trial opens it again for a cooldown
+    breaker.failure()
+    assert(not breaker.allow())
+    time.sleep(0.1)
+    assert(breaker.allow())
+    # A successful trial closes it
+    breaker.success()
+    assert(breaker.allow() and breaker.allow())
+
+    # Calls to a host whose breaker is open fail at once
+    scheduler = Scheduler(failure_threshold=1, cooldown=60)
+
+    def failing():
+        raise TransientError("HTTP 502")
+
+    try:
+        scheduler.call("http://down.example/", failing)
+        assert(False)
+    except TransientError:
+        pass
+    try:
+        scheduler.call("http://down.example/", lambda: "page")
+        assert(False)
+    except CircuitOpenError:
+        pass
+    assert(scheduler.call("http://up.example/", lambda: "page") == "page")
+
+    print("Success !")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+from main import waitUntil, networkIdle
+from tabdriver import BrowserTabs
+from driverpool import DriverPool
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webelement import WebElement
+
+import argparse
+import threading
+import time
+
+
+# Seconds a page of the session below takes to load
+LOAD_TIME = 0.3
+
+
+class Session:
+    # Stands for a Chrome session with the 'none' page load strategy: a page load returns at once, and scripts
+    # fail while the previous document is unloading. The commands of the session must not overlap.
+
+    def __init__(self):
+        self.window_handles = ["window-0"]
+        self.current_window_handle = "window-0"
+        self.urls = {}
+        self.loads = {} # handle -> (time the previous document is unloaded, time the page is loaded)
+        self.busy = threading.Lock()
+
+    def switch_to_window(self, handle):
+        assert(handle in self.window_handles)
+        self.current_window_handle = handle
+
+    def command(self):
+        assert(self.busy.acquire(blocking=False)), "Overlapping commands"
+        time.sleep(0.001)
+        self.busy.release()
+
+    def execute_script(self, script, *args):
+        self.command()
+        if script.startswith("window.open"):
+            self.window_handles.append("window-{}".format(len(self.window_handles)))
+            return None
+        unloaded, loaded = self.loads.get(self.current_window_handle, (0, 0))
+        if time.time() < unloaded:
+            raise WebDriverException("javascript error: document unloaded while waiting for result")
+        if "readyState" in script:
+            return time.time() >= loaded
+        return args
+
+    def get(self, url):
+        self.command()
+        self.urls[self.current_window_handle] = url
+        self.loads[self.current_window_handle] = (time.time() + LOAD_TIME / 2, time.time() + LOAD_TIME)
+
+    @property
+    def current_url(self):
+        return self.urls.get(self.current_window_handle)
+
+    def find_element_by_id(self, element_id):
+        self.command()
+        return WebElement(self, "{}/{}".format(self.current_window_handle, element_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test program, driving several games as tabs of a single session.")
+    args = parser.parse_args()
+
+    session = Session()
+    drivers = DriverPool(tabs=True)
+    drivers.browser = BrowserTabs(session)
+    tabs = [drivers.acquire(role) for role in ("segaretro", "wikipedia", "giantbomb", "segaretro")]
+    assert([tab.handle for tab in tabs] == ["window-0", "window-1", "window-2", "window-3"])
+
+    def browse(index, tab):
+        tab.get("http://example.com/{}".format(index))
+        assert(tab.current_url == "http://example.com/{}".format(index))
+        # Elements are used in the window they were found in, and given back to the session as is
+        element = tab.find_element_by_id("content")
+        assert(element.element.id == "{}/content".format(tab.handle))
+        assert(tab.execute_script("return arguments[0];", element)[0] is element.element)
+
+    # The tabs wait for their page at the same time
+    start = time.time()
+    threads = [threading.Thread(target=browse, args=(index, tab)) for index, tab in enumerate(tabs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert(time.time() - start < 2 * LOAD_TIME)
+
+    # A wait polling a document being unloaded goes on until the next one is loaded
+    session.loads[tabs[0].handle] = (time.time() + LOAD_TIME, time.time() + LOAD_TIME)
+    waitUntil(tabs[0], networkIdle, 5 * LOAD_TIME)
+
+    print("Success !")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+from barcodeindex import normalizeBarcode
+
+import datetime
+import re
+
+
+PRECISIONS = ("Day", "Month", "Year")
+
+
+class ValidationError(Exception):
+    # The problems found in a game before any of its forms is submitted, reported all at once
+    def __init__(self, problems):
+        super().__init__("{} problem(s): {}".format(len(problems), "; ".join(problems)))
+        self.problems = problems
+
+
+def checkDate(date):
+    if date is None:
+        return ["Release date: missing"]
+    problems = []
+    try:
+        if not re.match(r"^\d{4}-\d{2}-\d{2}$", date.partial_date):
+            raise ValueError("not formatted as YYYY-MM-DD")
+        day = datetime.date(*map(int, date.partial_date.split("-")))
+    except (AttributeError, TypeError, ValueError) as e:
+        return ["Release date: '{}' is not a date, {}".format(getattr(date, "partial_date", date), e)]
+    if date.precision not in PRECISIONS:
+        problems.append("Release date: unknown precision '{}'".format(date.precision))
+    # A partial date is stored on the first day of its month or year
+    elif (date.precision == "Month" and day.day != 1) or (date.precision == "Year" and (day.month, day.day) != (1, 1)):
+        problems.append("Release date: {} is not the start of a {}".format(date.partial_date, date.precision.lower()))
+    return problems
+
+
+def checkBarcode(barcode):
+    if barcode and not normalizeBarcode(barcode):
+        return ["Barcode: '{}' is not a valid EAN or UPC".format(barcode)]
+    return []
+
+
+def checkSelect(options, field_id, field_name, value, exact=False):
+    # Returns the problem of a value which matches none of the known options of a select, None otherwise.
+    # Selects whose options were not snapshotted yet cannot be checked.
+    if options is None or not options.isSelect(field_id):
+        return None
+    found = options.contains(field_id, value) if exact else options.resolve(field_id, value) is not None
+    if not found:
+        return "{}: '{}' is not a Collecster option".format(field_name, value)
+    return None
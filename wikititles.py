@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+from optionindex import normalize
+from scheduler import scheduler
+
+import functools
+import gzip
+import os.path
+import re
+import sqlite3
+import threading
+import urllib.parse
+
+
+# The disambiguation of a video game article, such as "(video game)" or "(1984 video game)"
+GAME_DISAMBIGUATION = re.compile(r"^(.*) \((?:\d{4} )?video game\)$")
+
+
+class TitleIndex:
+    # Article titles of the English Wikipedia, looked up by normalized title.
+    # It is built once from the dump of all the titles (enwiki-latest-all-titles-in-ns0.gz).
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+    @classmethod
+    def build(cls, dump_path, path):
+        opener = gzip.open if dump_path.endswith(".gz") else open
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = sqlite3.connect(path + ".tmp")
+        with connection:
+            connection.execute("DROP TABLE IF EXISTS titles")
+            connection.execute("CREATE TABLE titles (key TEXT, game_of TEXT, title TEXT)")
+
+            def rows():
+                with opener(dump_path, "rt", encoding="utf-8") as dump:
+                    for line in dump:
+                        title = line.rstrip("\n").replace("_", " ")
+                        game = GAME_DISAMBIGUATION.match(title)
+                        yield normalize(title), normalize(game.group(1)) if game else None, title
+
+            connection.executemany("INSERT INTO titles VALUES (?, ?, ?)", rows())
+            connection.execute("CREATE INDEX titles_key ON titles (key)")
+            connection.execute("CREATE INDEX titles_game_of ON titles (game_of)")
+        connection.close()
+        os.replace(path + ".tmp", path)
+        return cls(path)
+
+    def find(self, title):
+        with self.lock:
+            row = self.connection.execute("SELECT title FROM titles WHERE key = ?", (normalize(title),)).fetchone()
+        return row[0] if row else None
+
+    def games(self, name):
+        # The video game articles of this name, with any year in their disambiguation
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT title FROM titles WHERE game_of = ?",
+                                                              (normalize(name),))]
+
+    def close(self):
+        self.connection.close()
+
+
+class WikipediaTitles:
+    # Resolves a game name to its Wikipedia article title, trying the usual disambiguations in order.
+    # Titles are checked against the local index when there is one, otherwise with a single query to the
+    # Wikipedia API. Results are memoized, and kept in the scrapping cache between runs.
+    article_url = "https://en.wikipedia.org/wiki/"
+    api_url = "https://en.wikipedia.org/w/api.php"
+
+    def __init__(self, index=None, cache=None, session=None, timeout=30):
+        self.index = index
+        self.cache = cache
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        self.timeout = timeout
+        self.memo = {}
+        self.lock = threading.Lock()
+
+    def candidates(self, name, systems):
+        return ["{} (video game)".format(name)] \
+               + ["{} ({})".format(name, system) for system in systems] \
+               + [name]
+
+    def resolve(self, name, systems=()):
+        key = "|".join([normalize(name)] + list(systems))
+        with self.lock:
+            if key in self.memo:
+                return self.memo[key]
+        title = self.cache.getFields("wikipedia-title", key) if self.cache else None
+        if not title:
+            title = self._lookupIndex(name, systems) if self.index else self._lookupOnline(name, systems)
+            if title and self.cache:
+                self.cache.putFields("wikipedia-title", key, title)
+        with self.lock:
+            self.memo[key] = title
+        return title
+
+    def url(self, title):
+        return self.article_url + urllib.parse.quote(title.replace(" ", "_"), safe="()_,.:'!/")
+
+    def _lookupIndex(self, name, systems):
+        candidates = self.candidates(name, systems)
+        title = self.index.find(candidates[0])
+        if title:
+            return title
+        # Games sharing their name with another game are told apart by their year
+        games = self.index.games(name)
+        if len(games) == 1:
+            return games[0]
+        for candidate in candidates[1:]:
+            title = self.index.find(candidate)
+            if title:
+                return title
+        return None
+
+    def _lookupOnline(self, name, systems):
+        candidates = self.candidates(name, systems)
+        parameters = {
+            "action": "query",
+            "format": "json",
+            "redirects": 1,
+            "prop": "pageprops",
+            "ppprop": "disambiguation",
+            "titles": "|".join(candidates),
+        }
+        response = scheduler.call(self.api_url, functools.partial(self.session.get, self.api_url,
+                                                                  params=parameters, timeout=self.timeout))
+        response.raise_for_status()
+        query = response.json().get("query", {})
+        # Candidates are followed through the title normalization and the redirects
+        renamed = {entry["from"]: entry["to"] for entry in query.get("normalized", []) + query.get("redirects", [])}
+        articles = {page["title"] for page in query.get("pages", {}).values()
+                    if "missing" not in page and "disambiguation" not in page.get("pageprops", {})}
+        for candidate in candidates:
+            title = candidate
+            seen = set()
+            while title in renamed and title not in seen:
+                seen.add(title)
+                title = renamed[title]
+            if title in articles:
+                return title
+        return None